@@ -1,31 +1,327 @@
 import subprocess
+import socket
 import os
-import winreg
-import keyboard
+import importlib
+import importlib.util
 import tkinter as tk
 from tkinter import font as tkfont
 import threading
+import queue
 import re
-import xml.etree.ElementTree as ET
 import configparser
 import urllib.parse
 from pathlib import Path
-import psutil
 import tempfile
 import shutil
-import win32gui
 from urllib.parse import unquote
-import win32gui
-import win32con
 import time
-# Registra namespaces UNA vez al importar
-ET.register_namespace('', 'http://xspf.org/ns/0/')
-ET.register_namespace('vlc', 'http://www.videolan.org/vlc/playlist/ns/0/')
+import sys
+import random
+import bisect
+import mmap
+import struct
+import hashlib
+import json
+import contextlib
+import unicodedata
+from array import array
+from stat import S_ISREG
+from xml.sax.saxutils import escape
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class _LazyModule:
+    """
+    Importa un módulo la primera vez que se usa uno de sus atributos, para
+    que arrancar el script no pague psutil, pywin32, sqlite3, etc. 'on_load'
+    se ejecuta una vez tras la importación.
+    """
+
+    def __init__(self, name, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_load:
+                        self._on_load(module)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def _register_xspf_namespaces(et):
+    # Registra namespaces UNA vez al importar
+    et.register_namespace('', 'http://xspf.org/ns/0/')
+    et.register_namespace('vlc', 'http://www.videolan.org/vlc/playlist/ns/0/')
+
+
+ET = _LazyModule('xml.etree.ElementTree', _register_xspf_namespaces)
+psutil = _LazyModule('psutil')
+keyboard = _LazyModule('keyboard')
+sqlite3 = _LazyModule('sqlite3')
+winreg = _LazyModule('winreg')
+win32gui = _LazyModule('win32gui')
+win32con = _LazyModule('win32con')
+win32process = _LazyModule('win32process')
+
+# Se cargan en segundo plano tras registrar los atajos (ver warm_up)
+_WARM_MODULES = (psutil, win32gui, win32con, win32process, winreg, sqlite3, ET,
+                 _LazyModule('pythoncom'), _LazyModule('win32com.client'))
+
+
+def warm_up():
+    """
+    Importa las dependencias pesadas y llena las cachés en un hilo de fondo
+    para que la primera pulsación de cada atajo no pague ese coste.
+    """
+    def run():
+        with tracer.span("startup.warm_up"):
+            for module in _WARM_MODULES:
+                try:
+                    module.load()
+                except ImportError as e:
+                    print(f"[X] No se pudo importar {module._name}: {e}")
+            vlc_tracker.find_pid()
+            current_song_cache.get()
+            find_vlc()
+
+    threading.Thread(target=run, daemon=True, name="warm-up").start()
+
+
+# ------------------------------------------------------------------
+#  Trazas de rendimiento
+# ------------------------------------------------------------------
+class _NullSpan:
+    """Span que no hace nada: lo que devuelve Tracer.span() si está apagado."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+class Tracer:
+    """
+    Mide cada etapa de los atajos con 'with tracer.span("selector.parse"):'.
+    Guarda percentiles p50/p95/p99 de las últimas muestras de cada etapa y
+    los eventos para exportarlos como JSON lines o formato Chrome trace
+    (chrome://tracing, Perfetto). Apagado, span() devuelve un objeto
+    compartido que no hace nada.
+
+    Se activa con la variable de entorno VLC_TRACE=<archivo>; al salir con
+    Ctrl+Alt+X se escribe ahí (.jsonl -> JSON lines, si no Chrome trace).
+    """
+
+    def __init__(self, enabled=False, history=500, max_events=20000):
+        self.enabled = enabled
+        self.output = None
+        self._history = history
+        self._samples = {}  # nombre -> deque de duraciones en ns
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, start_ns: int, duration_ns: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self._history)
+            samples.append(duration_ns)
+            self._events.append((name, start_ns, duration_ns, threading.get_ident()))
+
+    def stats(self) -> dict:
+        """{etapa: {'count', 'p50', 'p95', 'p99'}} en milisegundos."""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+        stats = {}
+        for name, ordered in snapshot.items():
+            last = len(ordered) - 1
+            stats[name] = {"count": len(ordered),
+                           **{f"p{q}": ordered[round(last * q / 100)] / 1e6
+                              for q in (50, 95, 99)}}
+        return stats
+
+    def print_stats(self):
+        for name, st in sorted(self.stats().items()):
+            print(f"[TRACE] {name:28s} n={st['count']:<5d} p50={st['p50']:8.2f} ms "
+                  f"p95={st['p95']:8.2f} ms p99={st['p99']:8.2f} ms")
+
+    def export_jsonl(self, path: str):
+        with self._lock:
+            events = list(self._events)
+        with open(path, 'w', encoding='utf-8') as f:
+            for name, start, duration, tid in events:
+                f.write(json.dumps({"name": name, "start_ns": start,
+                                    "duration_ns": duration, "thread": tid}) + "\n")
+
+    def export_chrome(self, path: str):
+        with self._lock:
+            events = list(self._events)
+        pid = os.getpid()
+        trace = [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+                  "pid": pid, "tid": tid} for name, start, duration, tid in events]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": trace}, f)
+
+    def dump(self):
+        """Escribe las trazas en self.output (si se configuró) y las resume."""
+        if not self.enabled:
+            return
+        self.print_stats()
+        if self.output:
+            if self.output.endswith(".jsonl"):
+                self.export_jsonl(self.output)
+            else:
+                self.export_chrome(self.output)
+            print(f"[TRACE] Trazas guardadas en {self.output}")
+
+
+tracer = Tracer(enabled=bool(os.getenv("VLC_TRACE")))
+tracer.output = os.getenv("VLC_TRACE") or None
 
 
 # ------------------------------------------------------------------
 #  Utilidades XSPF
 # ------------------------------------------------------------------
+_VLC_ITEM_RE = re.compile(rb'<vlc:item\b[^>]*/>')
+_VLC_EXTENSION_RE = re.compile(rb'[ \t]*<extension\b.*?</extension>[ \t]*\r?\n?', re.DOTALL)
+
+
+class XSPFRotator:
+    """
+    Genera playlists rotadas sin pasar por ElementTree. Con el índice de
+    offsets del archivo (XSPFOffsetIndex: rango de cada <track> y del texto
+    de su <vlc:id>) rotar es concatenar cabecera, pistas [idx:] + [:idx]
+    con su vlc:id renumerado, y pie.
+    """
+
+    def __init__(self):
+        self._path = None
+        self._key = None
+        self._index = None
+        self._data = b""
+
+    def _load(self, path: str):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        if path == self._path and key == self._key:
+            return
+
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        index = XSPFOffsetIndex(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if index.key != key or len(data) != key[1]:
+            index.close()
+            raise ValueError("la playlist ha cambiado mientras se leía")
+
+        self._path, self._key, self._data, self._index = path, key, data, index
+
+    def __len__(self):
+        return len(self._index) if self._index is not None else 0
+
+    def write(self, path: str, idx: int, out_path: str):
+        self._load(path)
+        n = len(self)
+        self.write_order(path, range(idx % n, idx % n + n) if n else (), out_path)
+
+    def write_order(self, path: str, order, out_path: str):
+        """
+        Escribe las pistas de 'path' en el orden dado ('order' son índices
+        de pista, se admiten repetidos y el módulo n).
+        """
+        self._load(path)
+        data = memoryview(self._data)
+        n = len(self)
+        if not n:
+            with open(out_path, 'wb') as f:
+                f.write(data)
+            return
+
+        # Por pista: inicio, fin, inicio y fin del texto de <vlc:id>
+        offs = self._index.offsets
+        sep = data[offs[1]:offs[4]] if n > 1 else b"\n"
+        parts = [data[:offs[0]]]
+        count = 0
+        for new_idx, i in enumerate(order):
+            count += 1
+            i %= n
+            start, end, id_start, id_end = offs[4 * i:4 * i + 4]
+            if new_idx:
+                parts.append(sep)
+            if id_start < 0:
+                parts.append(data[start:end])
+            else:
+                parts.append(data[start:id_start])
+                parts.append(str(new_idx).encode())
+                parts.append(data[id_end:end])
+        footer = data[offs[4 * n - 3]:]
+        if count != n:
+            footer = self._renumber_footer(bytes(footer), count)
+        parts.append(footer)
+
+        with open(out_path, 'wb') as f:
+            f.write(b"".join(parts))
+
+    @staticmethod
+    def _renumber_footer(footer: bytes, count: int) -> bytes:
+        """
+        El pie de VLC repite la lista de pistas (<vlc:item tid="..."/>); si
+        el número de pistas cambia se regenera para tid 0..count-1. Con
+        carpetas (<vlc:node>) no hay forma segura de rehacerla y se quita
+        la extensión: VLC usa entonces el orden de <trackList>.
+        """
+        items = list(_VLC_ITEM_RE.finditer(footer))
+        if not items:
+            return footer
+        if b'<vlc:node' in footer:
+            return _VLC_EXTENSION_RE.sub(b"", footer, count=1)
+        sep = footer[items[0].end():items[1].start()] if len(items) > 1 else b"\n"
+        new_items = sep.join(b'<vlc:item tid="%d"/>' % i for i in range(count))
+        return footer[:items[0].start()] + new_items + footer[items[-1].end():]
+
+
+xspf_rotator = XSPFRotator()
+
+
 def build_rotated_xspf(original_path: str, idx: int) -> str:
     """
     Crea una playlist temporal rotada a partir de 'original_path'.
@@ -33,68 +329,1754 @@ def build_rotated_xspf(original_path: str, idx: int) -> str:
     Devuelve la ruta del archivo temporal generado.
     """
     tmp_playlist = os.path.join(tempfile.gettempdir(), "vlc_rotada.xspf")
+    xspf_rotator.write(original_path, idx, tmp_playlist)
+    return tmp_playlist
 
-    tree = ET.parse(original_path)
-    root = tree.getroot()
 
-    # Extrae todas las pistas
-    tracks = root.findall('.//{http://xspf.org/ns/0/}track')
+XSPF_NS = 'http://xspf.org/ns/0/'
+VLC_NS = 'http://www.videolan.org/vlc/playlist/ns/0/'
 
-    # Rota la lista
-    rotated = tracks[idx:] + tracks[:idx]
 
-    # Limpia el trackList actual
-    tracklist = root.find('.//{http://xspf.org/ns/0/}trackList')
-    tracklist.clear()
+_LOCATION_TAG = f'{{{XSPF_NS}}}location'
+_TITLE_TAG = f'{{{XSPF_NS}}}title'
+_DURATION_TAG = f'{{{XSPF_NS}}}duration'
+_VLC_ID_TAG = f'{{{VLC_NS}}}id'
 
-    # Re-numera vlc:id para mantener consistencia con VLC
-    for new_idx, trk in enumerate(rotated):
-        vlc_ext = trk.find('{http://xspf.org/ns/0/}extension')
-        if vlc_ext is not None:
-            vlc_id = vlc_ext.find('{http://www.videolan.org/vlc/playlist/ns/0/}id')
-            if vlc_id is not None:
-                vlc_id.text = str(new_idx)
-                print(f'     |- vlc:id {vlc_id.text} -> {new_idx}')
-            else:
-                print('     |- vlc:id no encontrado')
+
+def _track_fields(track) -> dict:
+    """Campos de un elemento <track> como dict (title, location, duration, id)."""
+    location = title = duration = vlc_id = None
+    for child in track.iter():
+        tag = child.tag
+        if tag == _LOCATION_TAG:
+            location = child.text
+        elif tag == _TITLE_TAG:
+            title = child.text
+        elif tag == _DURATION_TAG:
+            duration = child.text
+        elif tag == _VLC_ID_TAG:
+            vlc_id = child.text
+
+    location = unquote(location) if location else ""
+    return {
+        "title": title or (Path(location).stem if location else "Desconocido"),
+        "location": location,
+        "duration": int(duration) if duration and duration.isdigit() else None,
+        "id": int(vlc_id) if vlc_id and vlc_id.isdigit() else None,
+    }
+
+
+def iter_xspf_tracks(playlist_path: str):
+    """
+    Lee un XSPF en streaming con ET.iterparse y va devolviendo cada pista
+    como dict (title, location, duration, id) según se cierra su <track>.
+    Los elementos ya procesados se eliminan para que la memoria no crezca
+    con el tamaño de la playlist.
+    """
+    track_tag = f'{{{XSPF_NS}}}track'
+    tracklist_tag = f'{{{XSPF_NS}}}trackList'
+
+    tracklist = None
+    for event, elem in ET.iterparse(playlist_path, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == tracklist_tag:
+                tracklist = elem
+            continue
+        if elem.tag == tracklist_tag:
+            break  # el resto (extension de VLC) no aporta pistas
+        if elem.tag != track_tag:
+            continue
+
+        yield _track_fields(elem)
+
+        elem.clear()
+        if tracklist is not None:
+            tracklist.remove(elem)
+
+
+class XSPFOffsetIndex:
+    """
+    Índice en disco (archivo '.idx' junto al XSPF, o en %TEMP% si no se
+    puede escribir ahí) con los offsets de cada <track>: inicio, fin, y
+    rango del texto de su <vlc:id> (-1 si no tiene). La cabecera guarda
+    mtime_ns y tamaño del XSPF; si no coinciden el índice se reconstruye
+    en una sola pasada. Se lee con mmap, así que abrirlo no depende del
+    número de pistas y track(i) solo parsea esa pista.
+    """
+    MAGIC = b"XSPFIDX1"
+    HEADER = struct.Struct("=8sqqq")  # magic, mtime_ns, tamaño, nº de pistas
+    FIELDS = 4
+    _TRACK_RE = re.compile(rb'<track\b[^>]*>.*?</track>', re.S)
+    _VLC_ID_RE = re.compile(rb'(<vlc:id>)[^<]*(</vlc:id>)')
+    _WRAP = (f'<trackList xmlns="{XSPF_NS}" xmlns:vlc="{VLC_NS}">'.encode(),
+             b'</trackList>')
+
+    def __init__(self, xspf_path: str, index_path: str | None = None):
+        self.xspf_path = xspf_path
+        st = os.stat(xspf_path)
+        self.key = (st.st_mtime_ns, st.st_size)
+        self.count = 0
+        self.offsets = memoryview(b"").cast('q')
+        self._mm = None
+
+        if index_path:
+            candidates = [index_path]
         else:
-            print('     |- extension no encontrada')
+            digest = hashlib.sha1(os.path.abspath(xspf_path).encode()).hexdigest()[:16]
+            candidates = [xspf_path + ".idx",
+                          os.path.join(tempfile.gettempdir(), f"vlc_xspf_{digest}.idx")]
+
+        built = None
+        for candidate in candidates:
+            if self._map(candidate):
+                self.index_path = candidate
+                return
+            if built is None:
+                built = self._build()
+            try:
+                self._write(candidate, built)
+            except OSError:
+                continue
+            if self._map(candidate):
+                self.index_path = candidate
+                return
+        raise OSError(f"No se pudo crear el índice de {xspf_path}")
 
-    # Vuelca las pistas rotadas
-    for trk in rotated:
-        tracklist.append(trk)
+    def _map(self, index_path: str) -> bool:
+        try:
+            f = open(index_path, 'rb')
+        except OSError:
+            return False
+        with f:
+            header = f.read(self.HEADER.size)
+            if len(header) < self.HEADER.size:
+                return False
+            magic, mtime_ns, size, count = self.HEADER.unpack(header)
+            expected = self.HEADER.size + count * self.FIELDS * 8
+            if magic != self.MAGIC or (mtime_ns, size) != self.key \
+                    or os.fstat(f.fileno()).st_size != expected:
+                return False
+            if count:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.offsets = memoryview(self._mm)[self.HEADER.size:].cast('q')
+        self.count = count
+        return True
 
-    # Guarda el XML temporal (usa prefijos ns0, vlc, etc.)
-    tree.write(tmp_playlist, encoding='utf-8', xml_declaration=True)
-    return tmp_playlist
+    def _build(self) -> array:
+        offsets = array('q')
+        if not self.key[1]:
+            return offsets
+        with open(self.xspf_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            open_tag = data.find(b'<trackList')
+            close_tag = data.rfind(b'</trackList>')
+            if open_tag < 0 or close_tag < 0:
+                raise ValueError("trackList no encontrado")
+            for m in self._TRACK_RE.finditer(data, open_tag, close_tag):
+                id_match = self._VLC_ID_RE.search(data, m.start(), m.end())
+                offsets.extend((m.start(), m.end(),
+                                id_match.end(1) if id_match else -1,
+                                id_match.start(2) if id_match else -1))
+        return offsets
+
+    def _write(self, index_path: str, offsets: array):
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, *self.key, len(offsets) // self.FIELDS))
+            f.write(offsets.tobytes())
+        os.replace(tmp_path, index_path)
+
+    def __len__(self):
+        return self.count
+
+    def is_stale(self) -> bool:
+        try:
+            st = os.stat(self.xspf_path)
+        except OSError:
+            return True
+        return (st.st_mtime_ns, st.st_size) != self.key
+
+    def span(self, i: int) -> tuple[int, int]:
+        i = range(self.count)[i]
+        return self.offsets[i * self.FIELDS], self.offsets[i * self.FIELDS + 1]
+
+    def tracks(self, start: int = 0, stop: int | None = None):
+        """Devuelve las pistas [start:stop] leyendo solo sus bytes."""
+        with open(self.xspf_path, 'rb') as f:
+            for i in range(self.count)[start:stop]:
+                begin, end = self.span(i)
+                f.seek(begin)
+                elem = ET.fromstring(self._WRAP[0] + f.read(end - begin) + self._WRAP[1])
+                yield _track_fields(elem[0])
+
+    def track(self, i: int) -> dict:
+        i = range(self.count)[i]
+        return next(self.tracks(i, i + 1))
+
+    def close(self):
+        self.offsets.release()
+        self.offsets = memoryview(b"").cast('q')
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
 
 
 # ------------------------------------------------------------------
-#  Utilidades VLC
+#  Modelo de playlist compacto
 # ------------------------------------------------------------------
-def find_vlc() -> str | None:
+class Track:
     """
-    Devuelve la ruta completa a vlc.exe buscando en ubicaciones comunes
-    y en el registro de Windows. None si no se encuentra.
+    Registro de una pista. Admite acceso tipo dict (track['title']) para
+    seguir siendo compatible con el código que usaba list[dict].
     """
-    common_paths = [
-        r"C:\Program Files\VideoLAN\VLC\vlc.exe",
-        r"C:\Program Files (x86)\VideoLAN\VLC\vlc.exe"
-    ]
-    for path in common_paths:
-        if os.path.isfile(path):
-            return path
+    __slots__ = ('title', 'location', 'duration', 'id')
+
+    def __init__(self, title, location, duration=None, id=None):
+        self.title = title
+        self.location = location
+        self.duration = duration
+        self.id = id
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __eq__(self, other):
+        if not isinstance(other, Track):
+            return NotImplemented
+        return (self.title, self.location, self.duration, self.id) == \
+               (other.title, other.location, other.duration, other.id)
+
+    def __repr__(self):
+        return f"Track({self.title!r}, {self.location!r})"
+
+
+class Playlist:
+    """
+    Playlist en columnas: los directorios se guardan una sola vez (tabla
+    de prefijos), nombres y títulos van concatenados en un único str con
+    sus offsets en array('l'), y duraciones / vlc:id en array('l')
+    (-1 = sin valor). Un título vacío significa "el nombre del archivo sin
+    extensión", que es el caso habitual y no ocupa nada.
+
+    Acceso por índice O(1), slicing e iteración devolviendo Track.
+    """
+    __slots__ = ('_dirs', '_dir_ids', '_names', '_name_offs',
+                 '_titles', '_title_offs', '_durations', '_ids')
+
+    def __init__(self, tracks=()):
+        self._dirs = []
+        self._dir_ids = array('l')
+        self._name_offs = array('l', [0])
+        self._title_offs = array('l', [0])
+        self._durations = array('l')
+        self._ids = array('l')
+
+        dir_index = {}
+        names, titles = [], []
+        name_len = title_len = 0
+        for track in tracks:
+            location = track['location']
+            cut = max(location.rfind('/'), location.rfind('\\')) + 1
+            directory, name = location[:cut], location[cut:]
+
+            dir_id = dir_index.get(directory)
+            if dir_id is None:
+                dir_id = dir_index[directory] = len(self._dirs)
+                self._dirs.append(directory)
+            self._dir_ids.append(dir_id)
+
+            names.append(name)
+            name_len += len(name)
+            self._name_offs.append(name_len)
+
+            title = track['title']
+            if name and title == Path(name).stem:
+                title = ""
+            titles.append(title)
+            title_len += len(title)
+            self._title_offs.append(title_len)
+
+            duration, vlc_id = track.get('duration'), track.get('id')
+            self._durations.append(-1 if duration is None else duration)
+            self._ids.append(-1 if vlc_id is None else vlc_id)
+
+        self._names = "".join(names)
+        self._titles = "".join(titles)
+
+    def __len__(self):
+        return len(self._dir_ids)
+
+    def _location(self, i):
+        name = self._names[self._name_offs[i]:self._name_offs[i + 1]]
+        return self._dirs[self._dir_ids[i]] + name
+
+    def _title(self, i):
+        title = self._titles[self._title_offs[i]:self._title_offs[i + 1]]
+        if title:
+            return title
+        name = self._names[self._name_offs[i]:self._name_offs[i + 1]]
+        return Path(name).stem if name else "Desconocido"
+
+    def title(self, i) -> str:
+        """Título de la pista i sin construir el Track completo."""
+        return self._title(range(len(self))[i])
+
+    def location(self, i) -> str:
+        return self._location(range(len(self))[i])
+
+    def duration(self, i) -> int | None:
+        duration = self._durations[i]
+        return None if duration < 0 else duration
+
+    def _track(self, i):
+        duration, vlc_id = self._durations[i], self._ids[i]
+        return Track(self._title(i), self._location(i),
+                     None if duration < 0 else duration,
+                     None if vlc_id < 0 else vlc_id)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Playlist(self._track(i) for i in range(len(self))[key])
+        return self._track(range(len(self))[key])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._track(i)
+
+    def nbytes(self) -> int:
+        """Tamaño aproximado en memoria (para el presupuesto de la caché)."""
+        return (sys.getsizeof(self._names) + sys.getsizeof(self._titles)
+                + sum(sys.getsizeof(d) for d in self._dirs)
+                + sum(sys.getsizeof(a) for a in (self._dir_ids, self._name_offs,
+                                                 self._title_offs, self._durations,
+                                                 self._ids)))
+
+    def __repr__(self):
+        return f"<Playlist {len(self)} pistas, {len(self._dirs)} carpetas>"
+
+
+class MappedPlaylist(Playlist):
+    """
+    Playlist leída de un snapshot con mmap: los registros de pista y los
+    textos se quedan en el archivo mapeado y cada título o ruta se
+    decodifica solo cuando se pide. Solo la tabla de carpetas se
+    decodifica al abrir. Misma interfaz que Playlist.
+    """
+    __slots__ = ('_mm', '_records', '_names_view', '_titles_view', '_count')
+    FIELDS = 7  # carpeta, nombre (inicio, fin), título (inicio, fin), duración, vlc:id
+
+    def __init__(self, mm, count, dirs, records, names, titles):
+        self._mm = mm
+        self._count = count
+        self._dirs = dirs
+        self._records = records
+        self._names_view = names
+        self._titles_view = titles
+
+    def __len__(self):
+        return self._count
+
+    def _name(self, i):
+        r = i * self.FIELDS
+        return str(self._names_view[self._records[r + 1]:self._records[r + 2]],
+                   'utf-8', 'surrogatepass')
+
+    def _location(self, i):
+        return self._dirs[self._records[i * self.FIELDS]] + self._name(i)
+
+    def _title(self, i):
+        r = i * self.FIELDS
+        begin, end = self._records[r + 3], self._records[r + 4]
+        if begin != end:
+            return str(self._titles_view[begin:end], 'utf-8', 'surrogatepass')
+        name = self._name(i)
+        return Path(name).stem if name else "Desconocido"
+
+    def duration(self, i) -> int | None:
+        duration = self._records[range(self._count)[i] * self.FIELDS + 5]
+        return None if duration < 0 else duration
+
+    def _track(self, i):
+        r = i * self.FIELDS
+        duration, vlc_id = self._records[r + 5], self._records[r + 6]
+        return Track(self._title(i), self._location(i),
+                     None if duration < 0 else duration,
+                     None if vlc_id < 0 else vlc_id)
+
+    def nbytes(self) -> int:
+        return len(self._mm) + sum(sys.getsizeof(d) for d in self._dirs)
+
+    def close(self):
+        for view in (self._records, self._names_view, self._titles_view):
+            view.release()
+        self._mm.close()
+
+
+def app_cache_dir() -> str:
+    r"""Carpeta de las cachés del script: %LOCALAPPDATA%\vlc-tooltip (o %TEMP%)."""
+    base = os.getenv("LOCALAPPDATA") or tempfile.gettempdir()
+    return os.path.join(base, "vlc-tooltip")
+
+
+class PlaylistSnapshot:
+    """
+    Snapshot binario de una playlist ya parseada, guardado en la carpeta
+    'snapshots' de app_cache_dir() (o en %TEMP%) con el hash de la ruta del
+    XSPF como nombre, para no volver a pasar el XSPF por ElementTree tras
+    reiniciar el script. Nunca se escribe en las carpetas de música.
+
+    Formato (enteros nativos):
+      cabecera   magic, versión, mtime_ns y tamaño del XSPF, nº de pistas,
+                 nº de carpetas y longitud de cada tabla de texto
+      int32[]    offsets de la tabla de carpetas (nº de carpetas + 1)
+      int32[]    un registro de MappedPlaylist.FIELDS valores por pista
+      bytes      tablas UTF-8 de carpetas, nombres y títulos
+
+    Si la cabecera no coincide con el XSPF actual (o con la versión del
+    formato) el snapshot se ignora y se reescribe tras parsear.
+    """
+    MAGIC = b"VLCPLSNP"
+    VERSION = 1
+    # magic, versión, relleno, mtime_ns, tamaño, pistas, carpetas,
+    # bytes de carpetas, de nombres y de títulos
+    HEADER = struct.Struct("=8sIIqqqqqqq")
+
+    def __init__(self, xspf_path: str, snapshot_path: str | None = None):
+        self.xspf_path = xspf_path
+        if snapshot_path:
+            self.candidates = [snapshot_path]
+        else:
+            normalized = os.path.normcase(os.path.abspath(xspf_path))
+            digest = hashlib.sha1(normalized.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+            self.candidates = [os.path.join(app_cache_dir(), "snapshots", f"{digest}.snap"),
+                               os.path.join(tempfile.gettempdir(), f"vlc_playlist_{digest}.snap")]
+
+    def _source_key(self):
+        st = os.stat(self.xspf_path)
+        return st.st_mtime_ns, st.st_size
+
+    def load(self, key=None) -> MappedPlaylist | None:
+        """Abre el snapshot si sigue siendo válido para el XSPF; si no, None."""
+        try:
+            key = key or self._source_key()
+        except OSError:
+            return None
+        for candidate in self.candidates:
+            playlist = self._map(candidate, key)
+            if playlist is not None:
+                return playlist
+        return None
+
+    def _map(self, path, key):
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return None
+        with f:
+            header = f.read(self.HEADER.size)
+            if len(header) < self.HEADER.size:
+                return None
+            (magic, version, _, mtime_ns, size, count, dir_count,
+             dirs_len, names_len, titles_len) = self.HEADER.unpack(header)
+            if magic != self.MAGIC or version != self.VERSION \
+                    or (mtime_ns, size) != key or not count:
+                return None
+            records_at = self.HEADER.size + (dir_count + 1) * 4
+            blobs_at = records_at + count * MappedPlaylist.FIELDS * 4
+            if os.fstat(f.fileno()).st_size != blobs_at + dirs_len + names_len + titles_len:
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(mm)
+        dir_offs = view[self.HEADER.size:records_at].cast('i')
+        dirs_view = view[blobs_at:blobs_at + dirs_len]
+        dirs = [str(dirs_view[dir_offs[d]:dir_offs[d + 1]], 'utf-8', 'surrogatepass')
+                for d in range(dir_count)]
+        dir_offs.release()
+        dirs_view.release()
+        names_at = blobs_at + dirs_len
+        playlist = MappedPlaylist(mm, count, dirs,
+                                  view[records_at:blobs_at].cast('i'),
+                                  view[names_at:names_at + names_len],
+                                  view[names_at + names_len:names_at + names_len + titles_len])
+        view.release()
+        return playlist
+
+    @staticmethod
+    def _utf8_column(text, offsets):
+        """Codifica una columna de texto y pasa sus offsets a bytes."""
+        data = text.encode('utf-8', 'surrogatepass')
+        if len(data) == len(text):  # solo ASCII: los offsets ya valen
+            return data, array('i', offsets)
+        byte_offsets = array('i', [0])
+        total = 0
+        for i in range(len(offsets) - 1):
+            total += len(text[offsets[i]:offsets[i + 1]].encode('utf-8', 'surrogatepass'))
+            byte_offsets.append(total)
+        return data, byte_offsets
+
+    def _serialize(self, playlist: Playlist, key) -> list:
+        count = len(playlist)
+        dirs = [d.encode('utf-8', 'surrogatepass') for d in playlist._dirs]
+        dir_offs = array('i', [0])
+        for d in dirs:
+            dir_offs.append(dir_offs[-1] + len(d))
+        names, name_offs = self._utf8_column(playlist._names, playlist._name_offs)
+        titles, title_offs = self._utf8_column(playlist._titles, playlist._title_offs)
+
+        fields = MappedPlaylist.FIELDS
+        records = array('i', bytes(count * fields * 4))
+        records[0::fields] = array('i', playlist._dir_ids)
+        records[1::fields] = name_offs[:-1]
+        records[2::fields] = name_offs[1:]
+        records[3::fields] = title_offs[:-1]
+        records[4::fields] = title_offs[1:]
+        records[5::fields] = array('i', playlist._durations)
+        records[6::fields] = array('i', playlist._ids)
+
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, 0, *key, count, len(dirs),
+                                  dir_offs[-1], len(names), len(titles))
+        return [header, dir_offs, records, b"".join(dirs), names, titles]
+
+    def save(self, playlist: Playlist, key) -> str | None:
+        """
+        Guarda 'playlist' asociada a key = (mtime_ns, tamaño) del XSPF del
+        que salió. Devuelve la ruta escrita, o None si no se pudo.
+        """
+        if not playlist or isinstance(playlist, MappedPlaylist):
+            return None
+        try:
+            parts = self._serialize(playlist, key)
+        except OverflowError:
+            return None  # tablas de más de 2 GB, no compensa
+        for candidate in self.candidates:
+            tmp_path = candidate + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(candidate), exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    for part in parts:
+                        f.write(part)
+                # En Windows falla si un snapshot anterior sigue mapeado;
+                # entonces se prueba la siguiente ubicación.
+                os.replace(tmp_path, candidate)
+            except OSError:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+                continue
+            return candidate
+        return None
+
 
+class PlaylistCache:
+    """
+    Caché LRU de playlists ya parseadas, con clave (ruta, mtime_ns, tamaño)
+    y un presupuesto máximo en bytes. Si el archivo cambia en disco la
+    entrada deja de coincidir y se vuelve a cargar.
+    """
+
+    def __init__(self, loader, max_bytes=64 * 1024 * 1024):
+        self._loader = loader
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # ruta -> (clave, playlist, bytes)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Hotkeys y precarga la usan desde varios hilos; mientras un hilo
+        # parsea, el resto espera y reutiliza su resultado.
+        self._lock = threading.RLock()
+
+    def get(self, path: str) -> Playlist:
+        with self._lock:
+            return self._get(path)
+
+    def _get(self, path: str) -> Playlist:
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return Playlist()
+        key = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        self.invalidate(path)
+        playlist = self._loader(path)
+        if playlist:  # no cachear errores ni playlists vacías
+            size = playlist.nbytes()
+            self._entries[path] = (key, playlist, size)
+            self._bytes += size
+            self._evict()
+        return playlist
+
+    def _evict(self):
+        # La entrada más reciente se conserva aunque supere el presupuesto
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def invalidate(self, path: str | None = None):
+        """Olvida una playlist concreta o, sin argumentos, todas."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": len(self._entries),
+                "bytes": self._bytes}
+
+
+# ------------------------------------------------------------------
+#  Búsqueda en la playlist
+# ------------------------------------------------------------------
+def normalize_text(text: str) -> str:
+    """Minúsculas y sin acentos: 'Canción Ñ' -> 'cancion n'."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class PlaylistSearchIndex:
+    """
+    Índice de búsqueda por subcadena sobre los títulos normalizados.
+    Guarda listas de posiciones por carácter y por trigrama; una consulta
+    nueva parte de la lista más corta y solo verifica esos candidatos.
+
+    search() es incremental: si la consulta amplía la anterior (se ha
+    tecleado una letra más) filtra el resultado previo en lugar de volver
+    al índice, y al borrar recupera el resultado guardado del prefijo.
+    """
+
+    def __init__(self, titles):
+        self._titles = [normalize_text(t) for t in titles]
+        postings = {}
+        for i, title in enumerate(self._titles):
+            grams = set(title)
+            grams.update(title[j:j + 3] for j in range(len(title) - 2))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {g: array('l', idx) for g, idx in postings.items()}
+        self._stack = []  # [(consulta normalizada, resultado)]
+
+    def __len__(self):
+        return len(self._titles)
+
+    def search(self, query: str) -> list[int] | None:
+        """Índices que contienen 'query', o None si la consulta está vacía."""
+        q = normalize_text(query)
+        if not q:
+            self._stack.clear()
+            return None
+
+        while self._stack and not q.startswith(self._stack[-1][0]):
+            self._stack.pop()
+        if self._stack and self._stack[-1][0] == q:
+            return self._stack[-1][1]
+
+        if self._stack:
+            titles = self._titles
+            result = [i for i in self._stack[-1][1] if q in titles[i]]
+        else:
+            result = self._lookup(q)
+        self._stack.append((q, result))
+        return result
+
+    def _lookup(self, q: str) -> list[int]:
+        if len(q) == 1:
+            return list(self._postings.get(q, ()))
+        grams = [q[j:j + 3] for j in range(len(q) - 2)] or list(q)
+        lists = [self._postings.get(g, ()) for g in grams]
+        candidates = min(lists, key=len)
+        titles = self._titles
+        return [i for i in candidates if q in titles[i]]
+
+
+# ------------------------------------------------------------------
+#  Cola de reproducción
+# ------------------------------------------------------------------
+class PlayQueue:
+    """
+    Orden de reproducción en memoria sobre 'tracks' (una Playlist): guarda
+    índices de pista en bloques de array('l') de hasta 2*BLOCK elementos y
+    un árbol de Fenwick con el tamaño de cada bloque para localizar una
+    posición. Saltar es O(1); insertar, quitar y acceder por posición,
+    O(log n) más un memmove dentro de un bloque (el árbol solo se rehace,
+    en O(n/BLOCK), al partir o vaciar un bloque). Barajar es O(n) y guarda
+    la semilla para poder repetir el orden.
+
+    El XSPF solo se genera en materialize(), cuando hay que lanzar VLC;
+    'writer(items, out_path)' lo escribe con las pistas en ese orden.
+    'source' es el archivo del que salen los índices (None si no hay) y
+    'path' el último archivo que se le ha dado a VLC.
+    """
+    BLOCK = 1024
+
+    def __init__(self, tracks, writer, source=None, order=None, aliases=None):
+        self.tracks = tracks
+        self.writer = writer
+        self.source = source
+        self.path = source
+        self.cursor = 0
+        self.seed = None
+        self._file_items = None  # orden de 'path' (None = el de 'tracks')
+        # Pistas del archivo que la cola sustituye por otra (p. ej. repetidas)
+        self._aliases = aliases or {}
+        self._lock = threading.RLock()
+        identity = array('l', range(len(tracks)))
+        order = identity if order is None else array('l', order)
+        self._reset(order)
+        self.dirty = order != identity  # cambios que VLC aún no tiene
+
+    def _reset(self, items):
+        items = array('l', items)
+        self._blocks = [items[i:i + self.BLOCK] for i in range(0, len(items), self.BLOCK)]
+        self._len = len(items)
+        self._reindex()
+
+    def _reindex(self):
+        """Rehace el árbol de Fenwick con el tamaño de cada bloque."""
+        tree = [0]
+        tree.extend(map(len, self._blocks))
+        m = len(self._blocks)
+        for i in range(1, m + 1):
+            parent = i + (i & -i)
+            if parent <= m:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top_bit = 1 << (m.bit_length() - 1) if m else 0
+
+    def _resize(self, b, delta):
+        """El bloque b ha ganado (o perdido) 'delta' elementos."""
+        tree = self._tree
+        i = b + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+        self._len += delta
+
+    def _locate(self, pos):
+        """(bloque, posición dentro del bloque) de la posición 'pos'."""
+        tree = self._tree
+        b = 0
+        step = self._top_bit
+        while step:
+            if b + step < len(tree) and tree[b + step] <= pos:
+                b += step
+                pos -= tree[b]
+            step >>= 1
+        return b, pos
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, pos):
+        b, i = self._locate(range(len(self))[pos])
+        return self._blocks[b][i]
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    @property
+    def current(self) -> int | None:
+        """Índice de pista en la posición actual (None si la cola está vacía)."""
+        return self[self.cursor] if len(self) else None
+
+    def upcoming(self):
+        """Índices desde la posición actual hasta el final y después el principio."""
+        if not len(self):
+            return
+        b, i = self._locate(self.cursor)
+        yield from self._blocks[b][i:]
+        for block in self._blocks[b + 1:]:
+            yield from block
+        for block in self._blocks[:b]:
+            yield from block
+        yield from self._blocks[b][:i]
+
+    def jump(self, pos) -> int:
+        with self._lock:
+            self.cursor = range(len(self))[pos]
+            return self[self.cursor]
+
+    def advance(self) -> int | None:
+        with self._lock:
+            if len(self):
+                self.cursor = (self.cursor + 1) % len(self)
+            return self.current
+
+    def insert(self, pos, item):
+        with self._lock:
+            n = len(self)
+            if not 0 <= pos <= n:
+                raise IndexError("posición fuera de la cola")
+            if pos == n and self._blocks and len(self._blocks[-1]) < self.BLOCK:
+                self._blocks[-1].append(item)
+                self._resize(len(self._blocks) - 1, 1)
+            elif pos == n:
+                self._blocks.append(array('l', [item]))
+                self._len += 1
+                self._reindex()
+            else:
+                b, i = self._locate(pos)
+                block = self._blocks[b]
+                block.insert(i, item)
+                self._resize(b, 1)
+                if len(block) > 2 * self.BLOCK:
+                    self._blocks[b:b + 1] = [block[:self.BLOCK], block[self.BLOCK:]]
+                    self._reindex()
+            if n and pos <= self.cursor:
+                self.cursor += 1  # la pista actual sigue siendo la misma
+            self.dirty = True
+
+    def play_next(self, item):
+        """Pone 'item' justo detrás de la pista actual."""
+        with self._lock:
+            self.insert(self.cursor + 1 if len(self) else 0, item)
+
+    def enqueue(self, item):
+        self.insert(len(self), item)
+
+    def remove(self, pos) -> int:
+        with self._lock:
+            pos = range(len(self))[pos]
+            b, i = self._locate(pos)
+            block = self._blocks[b]
+            item = block.pop(i)
+            self._resize(b, -1)
+            if not block:
+                del self._blocks[b]
+                self._reindex()
+            if pos < self.cursor:
+                self.cursor -= 1
+            elif self.cursor >= len(self):
+                self.cursor = 0
+            self.dirty = True
+            return item
+
+    def shuffle(self, seed=None):
+        """Baraja la cola dejando la pista actual la primera."""
+        with self._lock:
+            self.seed = random.randrange(2 ** 32) if seed is None else seed
+            items = list(self.upcoming())
+            rest = items[1:]
+            random.Random(self.seed).shuffle(rest)
+            self._reset(items[:1] + rest)
+            self.cursor = 0
+            self.dirty = True
+
+    def item_in_file(self, idx: int) -> int:
+        """Pista que ocupa la posición 'idx' del archivo que tiene VLC."""
+        if self._file_items is not None:
+            return self._file_items[idx]
+        return self._aliases.get(idx, idx)
+
+    def position_in_file(self, idx: int) -> int:
+        """Posición en la cola de la pista 'idx' del archivo que tiene VLC."""
+        with self._lock:
+            if not self.dirty:
+                return idx
+            item = self.item_in_file(idx)
+            offset = 0
+            for block in self._blocks:
+                try:
+                    return offset + block.index(item)
+                except ValueError:
+                    offset += len(block)
+            raise IndexError("la pista ya no está en la cola")
+
+    def track_name(self, item: int) -> str:
+        """Nombre de la pista como lo da NowPlayingService (sin extensión)."""
+        location = self.tracks.location(item)
+        if location.startswith("file:"):
+            location = decode_uri(location)
+        return Path(location).stem
+
+    def sync(self, name: str) -> bool:
+        """
+        Mueve la posición actual a la pista que VLC dice estar tocando
+        ('name' sin extensión): normalmente la siguiente, si no se busca.
+        """
+        with self._lock:
+            n = len(self)
+            for step in range(n):
+                pos = (self.cursor + step) % n
+                if self.track_name(self[pos]) == name:
+                    self.cursor = pos
+                    return True
+            return False
+
+    def follows(self, name: str) -> bool:
+        """
+        True si 'name' es la pista que sigue a la actual, en la cola o en el
+        archivo que tiene VLC: un cambio normal de pista y no un salto a mano.
+        """
+        with self._lock:
+            n = len(self)
+            if not n:
+                return False
+            current = self.current
+            candidates = [self[(self.cursor + 1) % n]]
+            file_items = self._file_items if self._file_items is not None \
+                else range(len(self.tracks))
+            try:
+                pos = file_items.index(current)
+            except ValueError:
+                pass
+            else:
+                candidates.append(file_items[(pos + 1) % len(file_items)])
+            return any(self.track_name(item) == name for item in candidates)
+
+    def matches(self, path: str, count: int) -> bool:
+        """True si 'path' (con 'count' pistas) es el archivo que tiene VLC de esta cola."""
+        items = self._file_items
+        return path == self.path and count == (len(items) if items is not None
+                                               else len(self.tracks))
+
+    def materialize(self, out_path: str) -> str:
+        """
+        Escribe la cola en 'out_path' empezando por la pista actual y la
+        deja en ese mismo orden, así que las posiciones del archivo y de
+        la cola vuelven a coincidir.
+        """
+        with self._lock:
+            items = array('l', self.upcoming())
+            self.writer(items, out_path)
+            self._reset(items)
+            self._file_items = items
+            self._aliases = {}
+            self.cursor = 0
+            self.dirty = False
+            self.path = out_path
+            return out_path
+
+
+# ------------------------------------------------------------------
+#  Carpetas -> playlist
+# ------------------------------------------------------------------
+def natural_sort_key(text: str):
+    """'pista 2' < 'pista 10' (los números se comparan como números)."""
+    return [int(part) if part.isdigit() else part.casefold()
+            for part in re.split(r'(\d+)', text)]
+
+
+class FolderIndex:
+    """
+    Lista los archivos de audio de una carpeta con os.scandir. Cada
+    directorio se cachea por su mtime (cambia al añadir/quitar entradas),
+    así que una segunda pulsación sobre la misma carpeta solo hace un
+    stat por directorio. La lista se vuelca a un XSPF temporal en lugar de
+    pasar cada ruta a VLC por línea de comandos.
+    """
+
+    def __init__(self, extensions=('.mp3',), recursive=False):
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.recursive = recursive
+        self._dirs = {}  # ruta -> (mtime_ns, archivos, subcarpetas)
+        # (ruta xspf, lista de archivos, (mtime_ns, tamaño) tras escribirlo):
+        # si otro escritor toca el archivo, la clave deja de coincidir
+        self._written = None
+
+    def _scan_dir(self, path: str):
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._dirs.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        files, subdirs = [], []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(self.extensions) and entry.is_file():
+                    files.append(entry.path)
+        files.sort(key=lambda f: natural_sort_key(os.path.basename(f)))
+        subdirs.sort(key=lambda d: natural_sort_key(os.path.basename(d)))
+        self._dirs[path] = (mtime, files, subdirs)
+        return files, subdirs
+
+    def files(self, folder: str) -> list[str]:
+        files, subdirs = self._scan_dir(folder)
+        if not self.recursive:
+            return files
+        result = list(files)
+        for sub in subdirs:
+            result.extend(self.files(sub))
+        return result
+
+    def write_xspf(self, files: list[str], out_path: str | None = None) -> str:
+        """Escribe 'files' como XSPF (si no es lo último escrito) y devuelve la ruta."""
+        if out_path is None:
+            out_path = os.path.join(tempfile.gettempdir(), FOLDER_QUEUE_FILE)
+        if self._written is not None and self._written[:2] == (out_path, files):
+            try:
+                st = os.stat(out_path)
+            except OSError:
+                pass
+            else:
+                if self._written[2] == (st.st_mtime_ns, st.st_size):
+                    return out_path
+
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n'
+                 f'<playlist xmlns="{XSPF_NS}" xmlns:vlc="{VLC_NS}" version="1">\n'
+                 '\t<trackList>\n']
+        for i, path in enumerate(files):
+            parts.append(f'\t\t<track>\n\t\t\t<location>{escape(Path(path).as_uri())}</location>\n'
+                         '\t\t\t<extension application="http://www.videolan.org/vlc/playlist/0">\n'
+                         f'\t\t\t\t<vlc:id>{i}</vlc:id>\n\t\t\t</extension>\n\t\t</track>\n')
+        parts.append('\t</trackList>\n</playlist>\n')
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write("".join(parts))
+        st = os.stat(out_path)
+        self._written = (out_path, list(files), (st.st_mtime_ns, st.st_size))
+        return out_path
+
+
+folder_index = FolderIndex()
+
+
+# ------------------------------------------------------------------
+#  Archivos duplicados
+# ------------------------------------------------------------------
+class DuplicateFinder:
+    """
+    Detecta la misma canción guardada con otra ruta o nombre, por etapas:
+    agrupa por tamaño; dentro de los grupos con más de un archivo compara
+    un hash del primer y último bloque de CHUNK bytes, y el hash completo
+    solo se calcula para los que siguen coincidiendo. stat y hashes van en
+    un ThreadPoolExecutor (la lectura y hashlib liberan el GIL) y los
+    hashes se guardan en memoria con la clave (ruta, tamaño, mtime_ns).
+    """
+    CHUNK = 64 * 1024
+
+    def __init__(self, workers=4, chunk=CHUNK):
+        self.workers = workers
+        self.chunk = chunk
+        self.bytes_hashed = 0
+        self.cache_hits = 0
+        self._hashes = {}  # (ruta, completo) -> (tamaño, mtime_ns, digest)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _map(self, fn, items):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="dedupe")
+        return list(self._pool.map(fn, items))
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _digest(self, path, size, mtime, full):
+        full = full or size <= 2 * self.chunk  # el parcial ya cubre todo el archivo
+        key = (path, full)
+        cached = self._hashes.get(key)
+        if cached is not None and cached[:2] == (size, mtime):
+            self.cache_hits += 1
+            return cached[2]
+
+        h = hashlib.blake2b(digest_size=16)
+        read = 0
+        try:
+            with open(path, 'rb') as f:
+                if full:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        h.update(block)
+                        read += len(block)
+                else:
+                    head = f.read(self.chunk)
+                    f.seek(-self.chunk, os.SEEK_END)
+                    tail = f.read(self.chunk)
+                    h.update(head)
+                    h.update(tail)
+                    read = len(head) + len(tail)
+        except OSError:
+            return None
+        digest = h.digest()
+        with self._lock:
+            self._hashes[key] = (size, mtime, digest)
+            self.bytes_hashed += read
+        return digest
+
+    def canonical(self, paths) -> list[int]:
+        """
+        Para cada ruta, el índice de la primera con el mismo contenido
+        (el suyo propio si no está repetida).
+        """
+        paths = list(paths)
+        canon = list(range(len(paths)))
+        first_by_path = {}
+        candidates = []
+        for i, path in enumerate(paths):
+            j = first_by_path.setdefault(os.path.normcase(os.path.abspath(path)), i)
+            if j != i:
+                canon[i] = j  # la misma ruta dos veces
+            else:
+                candidates.append(i)
+
+        stats = dict(zip(candidates, self._map(self._stat, [paths[i] for i in candidates])))
+        by_size = {}
+        for i in candidates:
+            if stats[i] is not None:
+                by_size.setdefault(stats[i][0], []).append(i)
+        groups = [g for g in by_size.values() if len(g) > 1]
+
+        for full in (False, True):
+            work = [i for g in groups for i in g]
+            digests = dict(zip(work, self._map(
+                lambda i: self._digest(paths[i], *stats[i], full), work)))
+            next_groups = []
+            for group in groups:
+                by_digest = {}
+                for i in group:
+                    if digests[i] is not None:
+                        by_digest.setdefault(digests[i], []).append(i)
+                for same in by_digest.values():
+                    if len(same) < 2:
+                        continue
+                    if full or stats[same[0]][0] <= 2 * self.chunk:
+                        for i in same:
+                            canon[i] = same[0]
+                    else:
+                        next_groups.append(same)
+            groups = next_groups
+
+        for i, j in enumerate(canon):
+            canon[i] = canon[j]  # j < i, ya resuelto
+        return canon
+
+    def groups(self, paths) -> list[list[str]]:
+        """Grupos de rutas con el mismo contenido (solo los que tienen más de una)."""
+        paths = list(paths)
+        found = {}
+        for i, j in enumerate(self.canonical(paths)):
+            found.setdefault(j, []).append(paths[i])
+        return [g for g in found.values() if len(g) > 1]
+
+    def unique(self, paths) -> list[str]:
+        """'paths' sin repetidos, conservando la primera aparición y el orden."""
+        paths = list(paths)
+        return [p for i, (p, j) in enumerate(zip(paths, self.canonical(paths))) if i == j]
+
+
+duplicate_finder = DuplicateFinder()
+
+
+# ------------------------------------------------------------------
+#  Biblioteca de playlists
+# ------------------------------------------------------------------
+def _parse_library_playlist(path: str):
+    """
+    (ruta, (mtime_ns, tamaño), ubicaciones, títulos) de un XSPF; la clave
+    es None si no se pudo leer. Va a nivel de módulo para poder usarse
+    desde un ProcessPoolExecutor.
+    """
+    try:
+        st = os.stat(path)
+        locations, titles = [], []
+        for track in iter_xspf_tracks(path):
+            locations.append(track['location'])
+            titles.append(track['title'])
+    except Exception:
+        return path, None, [], []
+    return path, (st.st_mtime_ns, st.st_size), locations, titles
+
+
+def library_roots() -> list[str]:
+    """Carpetas de la biblioteca: VLC_LIBRARY (separadas por ';') o Música."""
+    roots = os.getenv("VLC_LIBRARY")
+    if roots:
+        return [r for r in roots.split(os.pathsep) if r]
+    return [str(Path.home() / "Music")]
+
+
+class _LibraryMaps:
+    """
+    Estado de LibraryIndex. Una vez publicado no se modifica: refresh()
+    trabaja sobre copy() y las listas y conjuntos interiores se copian la
+    primera vez que se tocan (copy-on-write), así que las consultas leen
+    sin cerrojos mientras se indexa.
+    """
+    _WORD_RE = re.compile(r'\w+')
+
+    def __init__(self):
+        self.playlists = {}  # ruta -> ((mtime_ns, tamaño), array('l') de ids)
+        self.track_ids = {}  # ruta normalizada -> id
+        self.locations = []  # id -> ubicación
+        self.titles = []  # id -> título
+        self.containing = []  # id -> [rutas de playlist]
+        self.words = {}  # palabra -> set(ids)
+        self.sorted_words = []  # para buscar por prefijo
+        self._owned = None  # id() de lo ya copiado en esta ronda
+        self._words_changed = False
+
+    def copy(self) -> "_LibraryMaps":
+        maps = _LibraryMaps()
+        maps.playlists = dict(self.playlists)
+        maps.track_ids = dict(self.track_ids)
+        maps.locations = list(self.locations)
+        maps.titles = list(self.titles)
+        maps.containing = list(self.containing)
+        maps.words = dict(self.words)
+        maps.sorted_words = self.sorted_words
+        maps._owned = set()
+        return maps
+
+    def _own_containing(self, tid) -> list:
+        containing = self.containing[tid]
+        if id(containing) not in self._owned:
+            containing = self.containing[tid] = list(containing)
+            self._owned.add(id(containing))
+        return containing
+
+    def _own_word(self, word) -> set:
+        tids = self.words.get(word)
+        if tids is None:
+            tids = self.words[word] = set()
+            self._words_changed = True
+        elif id(tids) not in self._owned:
+            tids = self.words[word] = set(tids)
+        else:
+            return tids
+        self._owned.add(id(tids))
+        return tids
+
+    def add(self, path, key, locations, titles):
+        ids = array('l')
+        for location, title in zip(locations, titles):
+            track_key = LibraryIndex._track_key(location)
+            tid = self.track_ids.get(track_key)
+            if tid is None:
+                tid = self.track_ids[track_key] = len(self.locations)
+                self.locations.append(location)
+                self.titles.append(title)
+                containing = []
+                self._owned.add(id(containing))
+                self.containing.append(containing)
+            ids.append(tid)
+        self.playlists[path] = (key, ids)
+        for tid in set(ids):
+            containing = self._own_containing(tid)
+            if not containing:
+                for word in self._WORD_RE.findall(normalize_text(self.titles[tid])):
+                    self._own_word(word).add(tid)
+            containing.append(path)
+
+    def remove(self, path):
+        entry = self.playlists.pop(path, None)
+        if entry is None:
+            return
+        for tid in set(entry[1]):
+            containing = self._own_containing(tid)
+            containing.remove(path)
+            if not containing:  # ya no está en ninguna playlist
+                for word in self._WORD_RE.findall(normalize_text(self.titles[tid])):
+                    if word in self.words:
+                        tids = self._own_word(word)
+                        tids.discard(tid)
+                        if not tids:
+                            del self.words[word]
+                            self._words_changed = True
+
+    def seal(self) -> "_LibraryMaps":
+        """Termina la ronda de cambios: a partir de aquí es de solo lectura."""
+        if self._words_changed:
+            self.sorted_words = sorted(self.words)
+        self._owned = None
+        self._words_changed = False
+        return self
+
+
+class LibraryIndex:
+    """
+    Índice de todos los .xspf bajo 'roots'. Cada pista (por su ruta
+    normalizada) recibe un id; se guardan los ids de cada playlist y dos
+    índices invertidos: pista -> playlists que la contienen y palabra del
+    título -> pistas. refresh() solo vuelve a parsear las playlists nuevas
+    o con otro (mtime_ns, tamaño) y, si son al menos 'min_pool', lo hace
+    en un ProcessPoolExecutor con 'workers' procesos.
+
+    refresh() aplica los cambios sobre una copia (_LibraryMaps) y la
+    publica de una vez, así que las consultas (desde el hilo de Tk, a cada
+    pulsación y por cada fila visible) nunca esperan a una indexación.
+    """
+
+    def __init__(self, roots, workers=None, min_pool=8):
+        self.roots = list(roots)
+        self.workers = workers or os.cpu_count() or 1
+        self.min_pool = min_pool
+        self._maps = _LibraryMaps()
+        self._refresh_lock = threading.Lock()
+
+    @staticmethod
+    def _track_key(location: str) -> str:
+        return os.path.normcase(decode_uri(location))
+
+    def _discover(self) -> dict:
+        found = {}
+        for root in self.roots:
+            for folder, _, files in os.walk(root):
+                for name in files:
+                    if name.lower().endswith('.xspf'):
+                        path = os.path.join(folder, name)
+                        try:
+                            st = os.stat(path)
+                        except OSError:
+                            continue
+                        found[path] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def _parse(self, paths):
+        if self.workers > 1 and len(paths) >= self.min_pool:
+            chunksize = max(1, len(paths) // (self.workers * 4))
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                return list(pool.map(_parse_library_playlist, paths, chunksize=chunksize))
+        return [_parse_library_playlist(p) for p in paths]
+
+    def refresh(self) -> int:
+        """Sincroniza el índice con el disco. Devuelve cuántas playlists han cambiado."""
+        with self._refresh_lock:
+            found = self._discover()
+            current = self._maps
+            removed = [p for p in current.playlists if p not in found]
+            changed = [p for p, key in found.items()
+                       if current.playlists.get(p, (None,))[0] != key]
+            if not removed and not changed:
+                return 0
+            parsed = self._parse(changed)
+            maps = current.copy()
+            for path in removed:
+                maps.remove(path)
+            for path, key, locations, titles in parsed:
+                maps.remove(path)
+                if key is not None:
+                    maps.add(path, key, locations, titles)
+            self._maps = maps.seal()  # una sola asignación: las consultas ven una u otra
+            return len(removed) + len(changed)
+
+    # --- Consultas (sin cerrojo: leen el _LibraryMaps publicado) ---
+    def __len__(self):
+        return len(self._maps.playlists)
+
+    def title(self, tid: int) -> str:
+        return self._maps.titles[tid]
+
+    def location(self, tid: int) -> str:
+        return self._maps.locations[tid]
+
+    def playlists_of(self, tid: int) -> list[str]:
+        return list(self._maps.containing[tid])
+
+    def playlists_with(self, location: str) -> list[str]:
+        """Playlists que contienen la pista con esa ubicación."""
+        maps = self._maps
+        tid = maps.track_ids.get(self._track_key(location))
+        return [] if tid is None else list(maps.containing[tid])
+
+    def position(self, path: str, tid: int) -> int:
+        """Primera posición de la pista 'tid' en la playlist 'path'."""
+        return self._maps.playlists[path][1].index(tid)
+
+    def search(self, query: str, limit: int = 500) -> list[int]:
+        """
+        Ids de las pistas cuyo título tiene todas las palabras de 'query'
+        (la última vale como prefijo, para buscar mientras se teclea), en
+        el orden en que se indexaron.
+        """
+        words = _LibraryMaps._WORD_RE.findall(normalize_text(query))
+        if not words:
+            return []
+        maps = self._maps
+        sets = [maps.words.get(w, set()) for w in words[:-1]]
+        prefixed = maps.sorted_words
+        last = words[-1]
+        start = end = bisect.bisect_left(prefixed, last)
+        while end < len(prefixed) and prefixed[end].startswith(last):
+            end += 1
+        sets.append(set().union(*(maps.words[w] for w in prefixed[start:end])))
+        sets.sort(key=len)
+        result = set(sets[0]).intersection(*sets[1:])
+        return sorted(result)[:limit]
+
+    def stats(self) -> dict:
+        maps = self._maps
+        return {"playlists": len(maps.playlists),
+                "tracks": sum(1 for containing in maps.containing if containing),
+                "entries": sum(len(ids) for _, ids in maps.playlists.values()),
+                "words": len(maps.words)}
+
+
+# ------------------------------------------------------------------
+#  Caché de metadatos (SQLite)
+# ------------------------------------------------------------------
+def read_tags_mutagen(path: str):
+    """
+    Lector de etiquetas por defecto: (título, duración_ms) con mutagen si
+    está instalado; None si no está o el archivo no se puede leer.
+    """
+    try:
+        import mutagen
+    except ImportError:
+        return None
+    try:
+        media = mutagen.File(path, easy=True)
+    except Exception:
+        return None
+    if media is None:
+        return None
+    title = (media.get('title') or [None])[0]
+    length = getattr(media.info, 'length', None)
+    return title, int(length * 1000) if length else None
+
+
+def mutagen_available() -> bool:
+    """True si read_tags_mutagen puede leer algo (mutagen instalado)."""
+    return importlib.util.find_spec('mutagen') is not None
+
+
+class MetadataCache:
+    """
+    Títulos y duraciones reales por archivo, guardados en SQLite con la
+    clave (ruta, tamaño, mtime). Un escáner en segundo plano lee las
+    etiquetas con 'reader' (función ruta -> (título, duración_ms) o None)
+    solo de los archivos nuevos o modificados; lookup() resuelve una lista
+    completa de rutas con una sola consulta.
+
+    'reader_available' dice si el lector puede funcionar (por defecto, con
+    read_tags_mutagen, si mutagen está instalado); si no, no se escanea
+    nada en lugar de guardar filas vacías para toda la playlist.
+    """
+    BATCH = 500
+
+    def __init__(self, db_path: str | None = None, reader=read_tags_mutagen,
+                 reader_available=None):
+        if db_path is None:
+            os.makedirs(app_cache_dir(), exist_ok=True)
+            db_path = os.path.join(app_cache_dir(), "metadata.sqlite")
+        self.db_path = db_path
+        self.reader = reader
+        if reader_available is None:
+            reader_available = mutagen_available if reader is read_tags_mutagen else (lambda: True)
+        self.reader_available = reader_available
+        self.generation = 0  # sube cada vez que un escaneo guarda cambios
+        self._scan_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS media (
+                                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,
+                                title TEXT, duration_ms INTEGER)""")
+
+    def _connect(self):
+        # Una conexión por llamada: se usa desde varios hilos
+        return sqlite3.connect(self.db_path, timeout=5.0)
+
+    @staticmethod
+    def _query_paths(conn, paths, columns):
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (path TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM wanted")
+        conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((p,) for p in paths))
+        return conn.execute(f"SELECT media.path, {columns} FROM media "
+                            "JOIN wanted ON wanted.path = media.path")
+
+    def lookup(self, paths) -> dict:
+        """{ruta: (título, duración_ms)} de las rutas que ya estén en la caché."""
+        with self._connect() as conn:
+            rows = self._query_paths(conn, paths, "title, duration_ms")
+            return {path: (title, duration) for path, title, duration in rows}
+
+    def scan(self, paths) -> int:
+        """Lee las etiquetas de los archivos nuevos o cambiados. Devuelve cuántos."""
+        if not self.reader_available():
+            return 0
+        paths = list(paths)
+        conn = self._connect()
+        try:
+            known = {path: (size, mtime) for path, size, mtime
+                     in self._query_paths(conn, paths, "size, mtime_ns")}
+            batch, changed = [], 0
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if known.get(path) == (st.st_size, st.st_mtime_ns):
+                    continue
+                tags = self.reader(path) or (None, None)
+                batch.append((path, st.st_size, st.st_mtime_ns, tags[0], tags[1]))
+                if len(batch) >= self.BATCH:
+                    changed += self._store(conn, batch)
+            changed += self._store(conn, batch)
+        finally:
+            conn.close()
+        if changed:
+            self.generation += 1
+        return changed
+
+    @staticmethod
+    def _store(conn, batch) -> int:
+        if not batch:
+            return 0
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?)", batch)
+        stored = len(batch)
+        batch.clear()
+        return stored
+
+    def scan_async(self, paths):
+        """Lanza scan() en un hilo si no hay otro escaneo en marcha."""
+        if not self.reader_available() or not self._scan_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.scan(paths)
+            except Exception as e:
+                print(f"[X] Error escaneando metadatos: {e}")
+            finally:
+                self._scan_lock.release()
+
+        threading.Thread(target=run, daemon=True, name="metadata-scan").start()
+
+
+# ------------------------------------------------------------------
+#  Utilidades VLC
+# ------------------------------------------------------------------
+def _registry_install_dir() -> str | None:
+    r"""InstallDir de VLC en HKLM\SOFTWARE\VideoLAN\VLC, o None."""
     try:
         key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\VideoLAN\VLC")
         vlc_dir, _ = winreg.QueryValueEx(key, "InstallDir")
-        vlc_exe = os.path.join(vlc_dir, "vlc.exe")
-        if os.path.isfile(vlc_exe):
-            return vlc_exe
-    except FileNotFoundError:
-        pass
+        return vlc_dir
+    except (OSError, ImportError):
+        return None
+
+
+class VLCLocator:
+    """
+    Resuelve la ruta de vlc.exe probando, en orden: la variable VLC_PATH,
+    la caché en disco (validada con el mtime del ejecutable), el registro,
+    el PATH y las carpetas de instalación habituales. El resultado se
+    memoriza durante toda la vida del proceso y solo se vuelve a buscar
+    si un lanzamiento falla (invalidate()).
+
+    Sistema de archivos, registro y entorno son inyectables.
+    """
+
+    def __init__(self, cache_path=None, env=None, stat=os.stat, which=shutil.which,
+                 registry=_registry_install_dir):
+        if cache_path is None:
+            cache_path = os.path.join(app_cache_dir(), "vlc_path.json")
+        self.cache_path = cache_path
+        self.env = os.environ if env is None else env
+        self._stat = stat
+        self._which = which
+        self._registry = registry
+        self._resolved = None
+
+    def _mtime(self, path) -> int | None:
+        """mtime_ns si 'path' es un archivo, None si no existe."""
+        try:
+            st = self._stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns if S_ISREG(st.st_mode) else None
+
+    def find(self) -> str | None:
+        if self._resolved is not None:
+            return self._resolved
+
+        strategies = (self._from_env, self._from_disk_cache, self._from_registry,
+                      self._from_path, self._from_roots)
+        for strategy in strategies:
+            path = strategy()
+            if path is None:
+                continue
+            mtime = self._mtime(path)
+            if mtime is None:
+                continue
+            self._resolved = path
+            if strategy is not self._from_disk_cache:
+                self._save(path, mtime)
+            return path
+        return None
+
+    def invalidate(self):
+        """Olvida la ruta memorizada y la caché en disco (p. ej. tras fallar un lanzamiento)."""
+        self._resolved = None
+        try:
+            os.remove(self.cache_path)
+        except OSError:
+            pass
+
+    # --- Estrategias ---
+    def _from_env(self):
+        return self.env.get("VLC_PATH") or None
+
+    def _from_disk_cache(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = cached.get("path")
+        if path and self._mtime(path) == cached.get("mtime_ns"):
+            return path
+        return None
+
+    def _from_registry(self):
+        vlc_dir = self._registry()
+        return os.path.join(vlc_dir, "vlc.exe") if vlc_dir else None
+
+    def _from_path(self):
+        return self._which("vlc")
+
+    def _from_roots(self):
+        roots = [self.env.get("ProgramFiles"), self.env.get("ProgramFiles(x86)"),
+                 r"C:\Program Files", r"C:\Program Files (x86)"]
+        local = self.env.get("LOCALAPPDATA")
+        candidates = [os.path.join(root, "VideoLAN", "VLC", "vlc.exe") for root in roots if root]
+        if local:
+            candidates.append(os.path.join(local, "Programs", "VideoLAN", "VLC", "vlc.exe"))
+        for candidate in dict.fromkeys(candidates):
+            if self._mtime(candidate) is not None:
+                return candidate
+        return None
+
+    def _save(self, path, mtime):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"path": path, "mtime_ns": mtime}, f)
+        except OSError:
+            pass
+
+
+vlc_locator = VLCLocator()
+
+
+def find_vlc() -> str | None:
+    """
+    Devuelve la ruta completa a vlc.exe (memorizada tras la primera
+    búsqueda). None si no se encuentra.
+    """
+    return vlc_locator.find()
+
+
+def launch_vlc(args: list[str]) -> bool:
+    """
+    Lanza VLC con 'args'. Si la ruta memorizada ya no sirve, la vuelve a
+    buscar y reintenta una vez. False si VLC no se encuentra.
+    """
+    for _ in range(2):
+        vlc = find_vlc()
+        if not vlc:
+            return False
+        try:
+            subprocess.Popen([vlc] + args, cwd=os.path.dirname(vlc))
+            return True
+        except OSError as e:
+            print(f"[X] No se pudo lanzar {vlc}: {e}")
+            vlc_locator.invalidate()
+    return False
+
 
-    return None
+# Interfaz RC de VLC: las instancias que lanza este script la activan para
+# poder cambiar de pista sin matar y relanzar el reproductor.
+VLC_RC_HOST = "127.0.0.1"
+VLC_RC_PORT = 4212
+VLC_RC_ARGS = ["--extraintf=rc", f"--rc-host={VLC_RC_HOST}:{VLC_RC_PORT}", "--rc-quiet"]
+
+
+class VLCRemote:
+    """
+    Cliente de la interfaz RC (TCP) de VLC con conexión persistente.
+    Si VLC no tiene la interfaz activa los métodos devuelven None/False y
+    el llamador recurre a relanzar VLC.
+    """
+    PROMPT = b"> "
+
+    def __init__(self, host=VLC_RC_HOST, port=VLC_RC_PORT, timeout=1.0,
+                 connect=socket.create_connection):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._connect = connect
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        self._sock = self._connect((self.host, self.port), self.timeout)
+        self._sock.settimeout(self.timeout)
+        self._read_reply()  # mensaje de bienvenida
+
+    def close(self):
+        """Cierra la conexión; si hay un comando en curso, espera a que acabe."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _read_reply(self) -> str:
+        data = b""
+        while not data.endswith(self.PROMPT):
+            chunk = self._sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("VLC cerró la conexión RC")
+            data += chunk
+        return data[:-len(self.PROMPT)].decode("utf-8", errors="replace").strip()
+
+    def command(self, cmd: str) -> str | None:
+        """Envía un comando RC y devuelve su respuesta (None si no hay VLC)."""
+        with self._lock:
+            for _ in range(2):  # un reintento si la conexión guardada caducó
+                try:
+                    if self._sock is None:
+                        self._open()
+                    self._sock.sendall(cmd.encode("utf-8") + b"\n")
+                    return self._read_reply()
+                except OSError:
+                    self._close()
+            return None
+
+    def goto(self, idx: int) -> bool:
+        """Salta a la pista 'idx' (0-based) de la playlist cargada."""
+        reply = self.command(f"goto {idx + 1}")
+        return reply is not None and "error" not in reply.lower()
+
+    def is_playing(self) -> bool | None:
+        reply = self.command("is_playing")
+        return None if reply is None else reply.strip() == "1"
+
+
+vlc_remote = VLCRemote()
 
 
 def decode_uri(uri: str) -> str:
@@ -109,61 +2091,563 @@ def decode_uri(uri: str) -> str:
     return urllib.parse.unquote(uri)
 
 
+class VLCProcessTracker:
+    """
+    Recuerda el PID de VLC para no recorrer todos los procesos en cada atajo.
+    El PID cacheado se valida con su create_time (detecta PIDs reutilizados)
+    y solo se vuelve a escanear cuando el proceso ya no existe.
+
+    'process_iter' y 'process_factory' son inyectables (por defecto psutil)
+    para poder medirlo con tablas de procesos sintéticas.
+
+    Se usa desde los hilos de los atajos, el calentamiento y la precarga,
+    así que el estado cacheado se protege con un lock.
+    """
+
+    def __init__(self, process_iter=None, process_factory=None):
+        # None -> psutil, resuelto al usarse (psutil se importa en diferido)
+        self._process_iter = process_iter
+        self._process_factory = process_factory
+        self._proc = None
+        self._create_time = None
+        self._cmdline = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    def _iter_processes(self, attrs):
+        return (self._process_iter or psutil.process_iter)(attrs)
+
+    def _validate(self):
+        try:
+            proc = (self._process_factory or psutil.Process)(self._proc.pid)
+            return proc.create_time() == self._create_time
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
+    def _scan(self):
+        for proc in self._iter_processes(['pid', 'name', 'create_time']):
+            name = proc.info['name']
+            if name and 'vlc' in name.lower():
+                self._proc = proc
+                self._create_time = proc.info['create_time']
+                return proc
+        return None
+
+    def process(self):
+        """Devuelve el proceso de VLC (cacheado si sigue vivo) o None."""
+        with self._lock:
+            if self._proc is not None:
+                if self._validate():
+                    self.hits += 1
+                    return self._proc
+                self.invalidate()
+            self.misses += 1
+            return self._scan()
+
+    def cmdline(self):
+        """
+        Argumentos del VLC actual. Se memorizan mientras el proceso cacheado
+        siga siendo el mismo (no cambian durante su vida).
+        """
+        with self._lock:
+            proc = self.process()
+            if proc is None:
+                return None
+            if self._cmdline is None:
+                self._cmdline = proc.cmdline()
+            return self._cmdline
+
+    def find_pid(self):
+        proc = self.process()
+        return proc.pid if proc else None
+
+    def invalidate(self):
+        with self._lock:
+            self._proc = None
+            self._create_time = None
+            self._cmdline = None
+
+    def kill(self):
+        """
+        Mata todos los procesos cuyo nombre contenga 'vlc', no solo el
+        cacheado: si hay una segunda instancia abierta también se cierra,
+        como antes de existir la caché. Siempre recorre la tabla de procesos
+        (cerrar VLC precede a un relanzamiento, no es un camino caliente).
+        """
+        with self._lock:
+            targets = [p for p in self._iter_processes(['pid', 'name'])
+                       if p.info['name'] and 'vlc' in p.info['name'].lower()]
+            for proc in targets:
+                try:
+                    proc.kill()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            self.invalidate()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+vlc_tracker = VLCProcessTracker()
+
+
 def close_vlc():
     """
     Finaliza cualquier proceso cuyo nombre contenga 'vlc' (case-insensitive).
     """
-    for proc in psutil.process_iter(['name']):
-        if proc.info['name'] and 'vlc' in proc.info['name'].lower():
-            proc.kill()
+    vlc_remote.close()
+    vlc_tracker.kill()
+
+
+class CurrentSongCache:
+    """
+    Resuelve la canción actual desde vlc-qt-interface.ini y cachea el
+    resultado con la clave (st_mtime_ns, st_size) del archivo. Solo se
+    vuelve a parsear cuando el INI cambia, y únicamente se leen las
+    secciones [General] y [RecentsMRL].
+    """
+    SECTIONS = ("General", "RecentsMRL")
+
+    def __init__(self, ini_path=None):
+        self._ini_path = ini_path
+        self._key = None
+        self._value = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ini_path(self) -> Path:
+        if self._ini_path is None:
+            self._ini_path = Path(os.getenv("APPDATA", "")) / "vlc" / "vlc-qt-interface.ini"
+        return Path(self._ini_path)
+
+    def invalidate(self):
+        self._key = None
+        self._value = None
+
+    def get(self) -> str:
+        try:
+            st = os.stat(self.ini_path)
+        except OSError:
+            self.invalidate()
+            return "[X] No se encontro la configuracion de VLC"
+
+        key = (st.st_mtime_ns, st.st_size)
+        if key == self._key:
+            self.hits += 1
+            return self._value
+
+        self.misses += 1
+        try:
+            config = self._read_sections()
+        except Exception as e:
+            return f"[X] Error leyendo el archivo: {e}"
+
+        self._value = self._resolve(config)
+        self._key = key
+        return self._value
+
+    def _read_sections(self) -> configparser.RawConfigParser:
+        """Pasa a configparser solo las líneas de las secciones útiles."""
+        wanted = []
+        keep = False
+        with open(self.ini_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.startswith("["):
+                    keep = line.strip()[1:-1] in self.SECTIONS
+                if keep:
+                    wanted.append(line)
+
+        config = configparser.RawConfigParser(strict=False)
+        config.optionxform = str
+        config.read_string("".join(wanted))
+        return config
+
+    @staticmethod
+    def _resolve(config) -> str:
+        last_file = None
+        if config.has_option("General", "filedialog-path"):
+            raw_path = config.get("General", "filedialog-path")
+            match = re.search(r'file://[^)]+', raw_path)
+            if match:
+                last_file = decode_uri(match.group(0))
+
+        if not last_file and config.has_option("RecentsMRL", "list"):
+            recent_raw = config.get("RecentsMRL", "list")
+            uris = re.findall(r'"(file://[^"]+)"|(?<!")\b(file://[^,]+)', recent_raw)
+            uris = [decode_uri(u[0] or u[1]) for u in uris if (u[0] or u[1])]
+            if uris:
+                last_file = uris[0]
+
+        if not last_file:
+            return "(!) No se detecto ninguna cancion reciente."
+
+        return Path(last_file).stem
+
+
+current_song_cache = CurrentSongCache()
+
+
+class NowPlayingService:
+    """
+    Mantiene en memoria la pista que está sonando preguntando a VLC por su
+    interfaz RC ('status') en un hilo de fondo. El intervalo se adapta:
+    vuelve al mínimo tras un cambio de pista y crece mientras no cambia o
+    VLC no responde. Los suscriptores solo se avisan cuando la pista cambia.
+    """
+    _INPUT_RE = re.compile(r'new input:\s*(.+?)\s*\)')
+
+    def __init__(self, remote, min_interval=0.5, max_interval=5.0, backoff=1.5):
+        self.remote = remote
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.current = None  # nombre sin extensión o None si no se sabe
+        self._subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """callback(nombre) se llama desde el hilo del servicio."""
+        self._subscribers.append(callback)
+
+    def poll_once(self) -> bool:
+        """Consulta a VLC una vez. Devuelve True si la pista ha cambiado."""
+        reply = self.remote.command("status")
+        song = None
+        if reply:
+            match = self._INPUT_RE.search(reply)
+            if match:
+                song = Path(decode_uri(match.group(1))).stem
+        if song == self.current:
+            return False
+        self.current = song
+        if song is not None:
+            for callback in self._subscribers:
+                try:
+                    callback(song)
+                except Exception as e:
+                    print(f"[X] Error notificando cancion: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                changed = self.poll_once()
+            except Exception as e:  # el hilo no debe morir: sin él no se aplica la cola
+                print(f"[X] Error consultando VLC: {e}")
+                changed = False
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="now-playing")
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+now_playing = NowPlayingService(vlc_remote)
 
 
 def get_current_song() -> str:
     """
-    Lee vlc-qt-interface.ini para obtener la última pista reproducida.
-    Devuelve solo el nombre del archivo sin extensión o un mensaje de error.
+    Devuelve la pista actual (nombre sin extensión). Usa la información en
+    memoria de now_playing y, si VLC no la da, lee vlc-qt-interface.ini.
     """
-    appdata = os.getenv("APPDATA")
-    vlc_ini = Path(appdata) / "vlc" / "vlc-qt-interface.ini"
-    if not vlc_ini.exists():
-        return "[X] No se encontro la configuracion de VLC"
+    return now_playing.current or current_song_cache.get()
 
-    config = configparser.RawConfigParser(strict=False)
-    config.optionxform = str
-    try:
-        config.read(vlc_ini, encoding="utf-8")
-    except Exception as e:
-        return f"[X] Error leyendo el archivo: {e}"
 
-    last_file = None
-    if config.has_option("General", "filedialog-path"):
-        raw_path = config.get("General", "filedialog-path")
-        match = re.search(r'file://[^)]+', raw_path)
-        if match:
-            last_file = decode_uri(match.group(0))
+# ------------------------------------------------------------------
+#  Vigilancia de archivos
+# ------------------------------------------------------------------
+class FileWatcher:
+    """
+    Vigila una lista de archivos y llama a callback(rutas_cambiadas) cuando
+    cambian (mtime_ns o tamaño), en un hilo de fondo. En Windows espera a
+    las notificaciones de cambio de carpeta (FindFirstChangeNotification)
+    y si no están disponibles compara con stat cada 'interval' segundos.
+
+    Las ráfagas de escrituras se agrupan: un cambio solo se notifica cuando
+    el archivo lleva 'debounce' segundos sin volver a cambiar.
+    """
+
+    def __init__(self, callback, interval=1.0, debounce=0.3, use_notifications=True):
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self.use_notifications = use_notifications
+        self._paths = ()
+        self._snapshots = {}  # ruta -> (mtime_ns, tamaño) o None
+        self._pending = {}  # ruta -> (clave nueva, desde cuándo)
+        self._handles = None  # notificaciones de Windows por carpeta
+        self._reset_handles = False  # watch() cambió las carpetas
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _key(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def watch(self, paths):
+        """Sustituye la lista de archivos vigilados."""
+        paths = tuple(dict.fromkeys(str(p) for p in paths if p))
+        with self._lock:
+            if paths == self._paths:
+                return
+            self._paths = paths
+            self._snapshots = {p: self._snapshots.get(p, self._key(p)) for p in paths}
+            self._pending = {p: v for p, v in self._pending.items() if p in paths}
+            # Los handles los cierra el hilo vigilante: puede estar esperando en ellos.
+            self._reset_handles = True
+
+    def check(self, now=None) -> list:
+        """Compara con el último estado y devuelve los cambios ya estables."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            for path in self._paths:
+                key = self._key(path)
+                if key == self._snapshots.get(path):
+                    self._pending.pop(path, None)
+                    continue
+                pending = self._pending.get(path)
+                if pending is None or pending[0] != key:
+                    self._pending[path] = (key, now)  # sigue cambiando
+                elif now - pending[1] >= self.debounce:
+                    self._snapshots[path] = key
+                    del self._pending[path]
+                    ready.append(path)
+        return ready
+
+    def _open_handles(self):
+        try:
+            import win32file
+        except ImportError:
+            return None
+        flags = (win32file.FILE_NOTIFY_CHANGE_LAST_WRITE | win32file.FILE_NOTIFY_CHANGE_SIZE
+                 | win32file.FILE_NOTIFY_CHANGE_FILE_NAME)
+        handles = []
+        for folder in dict.fromkeys(os.path.dirname(os.path.abspath(p)) for p in self._paths):
+            try:
+                handles.append(win32file.FindFirstChangeNotification(folder, False, flags))
+            except Exception:
+                pass
+        return handles
+
+    def _close_handles(self):
+        if self._handles:
+            import win32file
+            for handle in self._handles:
+                try:
+                    win32file.FindCloseChangeNotification(handle)
+                except Exception:
+                    pass
+        self._handles = None
+
+    def _wait(self, timeout):
+        """Solo la llama el hilo vigilante, único dueño de los handles."""
+        with self._lock:
+            if self._reset_handles:
+                self._close_handles()
+                self._reset_handles = False
+            if self.use_notifications and self._handles is None and self._paths:
+                self._handles = self._open_handles() or []
+            handles = self._handles
+        if not handles:
+            self._stop.wait(timeout)
+            return
+        import win32event
+        import win32file
+        result = win32event.WaitForMultipleObjects(handles, False, int(timeout * 1000))
+        index = result - win32event.WAIT_OBJECT_0
+        if 0 <= index < len(handles):
+            win32file.FindNextChangeNotification(handles[index])
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._wait(self.debounce / 2 if self._pending else self.interval)
+                changed = self.check()
+                if changed:
+                    self.callback(changed)
+            except Exception as e:
+                print(f"[X] Error procesando cambios: {e}")
+                self._stop.wait(self.interval)
+        with self._lock:
+            self._close_handles()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="file-watcher")
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# ------------------------------------------------------------------
+#  Despachador de atajos
+# ------------------------------------------------------------------
+class HotkeyDispatcher:
+    """
+    Saca el trabajo de los atajos del hilo del hook de teclado: cada atajo
+    se ejecuta en un pool de hilos acotado y lo que toque Tk se encola con
+    call_soon() para que lo ejecute el hilo de Tk (root.after drena la cola).
+
+    Si se pulsa de nuevo un atajo que aún no ha terminado, la pulsación se
+    descarta (coalesce) en lugar de acumularse. Guarda la latencia desde la
+    pulsación hasta que el trabajo y su parte de interfaz han terminado.
 
-    if not last_file and config.has_option("RecentsMRL", "list"):
-        recent_raw = config.get("RecentsMRL", "list")
-        uris = re.findall(r'"(file://[^"]+)"|(?<!")\b(file://[^,]+)', recent_raw)
-        uris = [decode_uri(u[0] or u[1]) for u in uris if (u[0] or u[1])]
-        if uris:
-            last_file = uris[0]
+    El trabajo de fondo (precarga, biblioteca) va por background(), a un
+    hilo aparte, para que un escaneo largo no deje a los atajos sin hilos.
+    """
+
+    def __init__(self, root, max_workers=2, poll_ms=15, history=100):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="hotkey")
+        self._background = ThreadPoolExecutor(max_workers=1,
+                                              thread_name_prefix="background")
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._background_pending = set()
+        self._lock = threading.Lock()
+        self._history = history
+        self.latencies = {}  # nombre -> deque de segundos
+        self.coalesced = 0
+        self.root.after(self.poll_ms, self._drain)
+
+    def hotkey(self, name, work):
+        """Callback para keyboard.add_hotkey que despacha 'work'."""
+        return lambda: self.submit(name, work)
+
+    def submit(self, name, work) -> bool:
+        with self._lock:
+            if name in self._pending:
+                self.coalesced += 1
+                return False
+            self._pending.add(name)
+        self._pool.submit(self._run, name, work, time.perf_counter())
+        return True
+
+    def background(self, name, work) -> bool:
+        """
+        Encola 'work' en el hilo de fondo. Si ya hay uno con ese nombre
+        esperando se descarta; si ya ha empezado se encola otro, que verá
+        los cambios que el primero ya no podía ver.
+        """
+        with self._lock:
+            if name in self._background_pending:
+                return False
+            self._background_pending.add(name)
+        self._background.submit(self._run_background, name, work)
+        return True
+
+    def _run_background(self, name, work):
+        with self._lock:
+            self._background_pending.discard(name)
+        try:
+            work()
+        except Exception as e:
+            print(f"[X] Error en '{name}': {e}")
 
-    if not last_file:
-        return "(!) No se detecto ninguna cancion reciente."
+    def call_soon(self, fn, *args):
+        """Ejecuta fn(*args) en el hilo de Tk (seguro desde cualquier hilo)."""
+        self._queue.put((fn, args))
 
-    return Path(last_file).stem
+    def _run(self, name, work, started):
+        try:
+            work()
+        except Exception as e:
+            print(f"[X] Error en '{name}': {e}")
+        finally:
+            # Va detrás de lo que haya encolado 'work': mide hasta la interfaz
+            self.call_soon(self._finish, name, started)
+
+    def _finish(self, name, started):
+        elapsed = time.perf_counter() - started
+        tracer.record(f"hotkey.{name}", int(started * 1e9), int(elapsed * 1e9))
+        self.latencies.setdefault(name, deque(maxlen=self._history)).append(elapsed)
+        with self._lock:
+            self._pending.discard(name)
+        print(f"[LAT] {name}: {elapsed * 1000:.1f} ms")
+
+    def _drain(self):
+        try:
+            while True:
+                fn, args = self._queue.get_nowait()
+                try:
+                    fn(*args)
+                except Exception as e:
+                    print(f"[X] Error en interfaz: {e}")
+        except queue.Empty:
+            pass
+        self.root.after(self.poll_ms, self._drain)
+
+    def latency_stats(self) -> dict:
+        """{nombre: (pulsaciones, mediana_ms, max_ms)} de las últimas pulsaciones."""
+        stats = {}
+        for name, samples in self.latencies.items():
+            ordered = sorted(samples)
+            stats[name] = (len(ordered), ordered[len(ordered) // 2] * 1000,
+                           ordered[-1] * 1000)
+        return stats
 
 
 # ------------------------------------------------------------------
 #  Controlador principal
 # ------------------------------------------------------------------
+# Se alternan para no sobrescribir el XSPF del que sale la propia cola
+QUEUE_FILES = ("vlc_cola.xspf", "vlc_cola_2.xspf")
+# Las colas de carpeta (sin playlist de origen) van siempre a su propio archivo
+FOLDER_QUEUE_FILE = "vlc_carpeta.xspf"
+# VLC reescribe su INI a cada cambio de pista: la biblioteca no se recorre
+# por eso más de una vez cada tantos segundos
+LIBRARY_REFRESH_INTERVAL = 300.0
+
+
 class VLCController:
     def __init__(self):
         self.tooltip_window = None
-        self.tooltip_timer = None
+        self.tooltip_label = None
+        self.tooltip_timer = None  # id de root.after del auto-cierre
         self.root = None
+        self.dispatcher = None
         self.playlist_window = None
+        self._selector_song_changed = None
+        self.playlist_cache = PlaylistCache(self.load_playlist)
+        self._search = None  # (playlist, metadatos, Future[PlaylistSearchIndex])
+        self._metadata = None  # (playlist, generación, {índice: (título, duración)})
+        self.metadata_cache = None
+        self.file_watcher = None
+        self.play_queue = None
+        # Filtro opcional: no encolar la misma canción dos veces
+        self.skip_duplicates = bool(os.getenv("VLC_DEDUPE"))
+        self.library = LibraryIndex(library_roots())
+        self._library_refresh = None  # (playlist activa, time.monotonic()) del último
+        self._library_stale = False  # la playlist activa se ha guardado
+        self._search_pool = ThreadPoolExecutor(max_workers=1)
+        # Elegir y encolar desde el selector: un solo hilo para respetar el
+        # orden de los clics y sin descartar ninguno (a diferencia de los atajos)
+        self._selector_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="selector")
+        # Cerrar y relanzar VLC desde dos hilos a la vez dejaría dos VLC
+        self._vlc_lock = threading.RLock()
 
     # --- Tkinter base (oculto) ---
     def init_tkinter(self):
@@ -171,29 +2655,51 @@ class VLCController:
             self.root = tk.Tk()
             self.root.withdraw()
             self.root.attributes('-topmost', True)
+            self.dispatcher = HotkeyDispatcher(self.root)
 
-    # --- Tooltip personalizado ---
-    def show_custom_tooltip(self, text: str):
-        self.close_tooltip()
-        if not text.strip():
-            return
-
-        if not self.root:
-            self.init_tkinter()
+    def ui(self, fn, *args):
+        """Ejecuta fn en el hilo de Tk; desde otros hilos lo encola."""
+        if self.dispatcher is None or threading.current_thread() is threading.main_thread():
+            fn(*args)
+        else:
+            self.dispatcher.call_soon(fn, *args)
 
+    # --- Tooltip personalizado ---
+    def _build_tooltip(self):
+        """Crea una sola vez la ventana del tooltip; luego solo se reutiliza."""
         self.tooltip_window = tk.Toplevel(self.root)
+        self.tooltip_window.withdraw()
         self.tooltip_window.overrideredirect(True)
         self.tooltip_window.attributes('-topmost', True)
         self.tooltip_window.config(bg="#404040")
 
-        label = tk.Label(
-            self.tooltip_window, text=text,
+        self.tooltip_label = tk.Label(
+            self.tooltip_window,
             font=tkfont.Font(family="Calibri", size=10, weight='bold'),
             fg="#F3F3F3", bg="#101010", justify=tk.LEFT,
             padx=8, pady=8
         )
-        label.pack(padx=1, pady=1)
+        self.tooltip_label.pack(padx=1, pady=1)
+
+    def show_custom_tooltip(self, text: str):
+        self.close_tooltip()
+        if not text.strip():
+            return
 
+        if not self.root:
+            self.init_tkinter()
+
+        with tracer.span("tooltip.render"):
+            self._render_tooltip(text)
+
+        # Auto-cerrar tras 5 s (en el hilo de Tk, cancelable)
+        self.tooltip_timer = self.root.after(5000, self.close_tooltip)
+
+    def _render_tooltip(self, text: str):
+        if self.tooltip_window is None or not self.tooltip_window.winfo_exists():
+            self._build_tooltip()
+
+        self.tooltip_label.config(text=text)
         self.tooltip_window.update_idletasks()
         width, height = self.tooltip_window.winfo_reqwidth(), self.tooltip_window.winfo_reqheight()
         screen_width, screen_height = self.tooltip_window.winfo_screenwidth(), self.tooltip_window.winfo_screenheight()
@@ -201,125 +2707,440 @@ class VLCController:
         self.tooltip_window.deiconify()
         self.tooltip_window.lift()
 
-        # Auto-cerrar tras 5 s
-        if self.tooltip_timer:
-            self.tooltip_timer.cancel()
-        self.tooltip_timer = threading.Timer(5.0, self.close_tooltip)
-        self.tooltip_timer.start()
-
     def close_tooltip(self):
         if self.tooltip_timer:
-            self.tooltip_timer.cancel()
+            self.root.after_cancel(self.tooltip_timer)
             self.tooltip_timer = None
         if self.tooltip_window:
             try:
-                self.tooltip_window.destroy()
-            except:
-                pass
-            self.tooltip_window = None
+                self.tooltip_window.withdraw()
+            except tk.TclError:
+                self.tooltip_window = None
+
+    def on_song_changed(self, name: str):
+        """Actualiza el tooltip visible y la cabecera del selector abierto."""
+        try:
+            if self.tooltip_window is not None and self.tooltip_window.winfo_viewable():
+                self.show_custom_tooltip(name)
+            if self._selector_song_changed and self.playlist_window is not None \
+                    and self.playlist_window.winfo_exists():
+                self._selector_song_changed(name)
+        except tk.TclError:
+            pass
 
     def show_song_tooltip(self):
-        pid = self.find_vlc_process()
+        with tracer.span("tooltip.find_vlc"):
+            pid = self.find_vlc_process()
         if not pid:
             print("[X] VLC no esta ejecutandose")
             return None
-        info = get_current_song()
+        with tracer.span("tooltip.current_song"):
+            info = get_current_song()
         print(f"[INFO] Tooltip info: {info}")
-        if self.root:
-            self.root.after(0, lambda: self.show_custom_tooltip(info))
+        self.ui(self.show_custom_tooltip, info)
 
     # --- Lectura de playlist ---
     def find_vlc_process(self):
-        for proc in psutil.process_iter(['pid', 'name']):
-            if proc.info['name'] and 'vlc' in proc.info['name'].lower():
-                return proc.info['pid']
-        return None
-
-    def get_vlc_playlist_path(self):
-        pid = self.find_vlc_process()
-        if not pid:
-            print("[X] VLC no esta ejecutandose")
-            return None
+        return vlc_tracker.find_pid()
 
+    def get_vlc_playlist_path(self, verbose=True):
         try:
-            process = psutil.Process(pid)
-            for arg in process.cmdline():
+            args = vlc_tracker.cmdline()
+            if args is None:
+                if verbose:
+                    print("[X] VLC no esta ejecutandose")
+                return None
+            for arg in args:
                 if arg.lower().endswith('.xspf'):
                     return arg
             return None
         except Exception as e:
+            vlc_tracker.invalidate()
             print(f"[X] Error al leer proceso: {e}")
             return None
 
-    def read_xspf_playlist(self, playlist_path: str) -> list[dict]:
-        playlist = []
-        try:
-            tree = ET.parse(playlist_path)
-            root = tree.getroot()
-            ns = {'ns': 'http://xspf.org/ns/0/'}  # sin espacio final
-
-            for track in root.findall('.//ns:track', ns):
-                location = track.find('ns:location', ns)
-                title_node = track.find('ns:title', ns)
-
-                if title_node is not None and title_node.text:
-                    title = title_node.text
-                else:
-                    title = Path(unquote(location.text)).stem if location is not None else "Desconocido"
+    def vlc_has_playlist(self, playlist_path: str) -> bool:
+        """True si 'playlist_path' es la playlist con la que se lanzó VLC."""
+        current = self.get_vlc_playlist_path(verbose=False)
+        if not current:
+            return False
+        same = [os.path.normcase(os.path.abspath(p)) for p in (current, playlist_path)]
+        return same[0] == same[1]
 
-                playlist.append({
-                    "title": title,
-                    "location": unquote(location.text) if location is not None else ""
-                })
+    def read_xspf_playlist(self, playlist_path: str) -> Playlist:
+        try:
+            return Playlist(iter_xspf_tracks(playlist_path))
         except Exception as e:
             print(f"[X] Error al leer la playlist: {e}")
+        return Playlist()
+
+    def load_playlist(self, playlist_path: str) -> Playlist:
+        """
+        Carga para la caché: el snapshot binario si sigue al día con el
+        XSPF y, si no, el XSPF parseado, dejando el snapshot para la
+        próxima vez (también tras reiniciar el script).
+        """
+        snapshot = PlaylistSnapshot(playlist_path)
+        try:
+            st = os.stat(playlist_path)
+        except OSError:
+            return Playlist()
+        key = (st.st_mtime_ns, st.st_size)
+        with tracer.span("playlist.snapshot_load"):
+            playlist = snapshot.load(key)
+        if playlist is not None:
+            return playlist
+        playlist = self.read_xspf_playlist(playlist_path)
+        with tracer.span("playlist.snapshot_save"):
+            snapshot.save(playlist, key)
         return playlist
 
+    @staticmethod
+    def track_label(playlist: Playlist, metadata: dict | None, i: int):
+        """(texto, duración_ms) de la pista i tal como la muestra el selector."""
+        label, duration = playlist.title(i), playlist.duration(i)
+        tags = metadata.get(i) if metadata else None
+        if tags:
+            label = tags[0] or label
+            duration = duration or tags[1]
+        return label, duration
+
+    def search_index(self, playlist: Playlist, metadata: dict | None = None):
+        """
+        Future con el índice de búsqueda de 'playlist'. Indexa el texto que
+        muestra el selector (el título de las etiquetas si lo hay) y también
+        el de la playlist. Se construye en segundo plano y se reutiliza
+        mientras la caché devuelva la misma playlist y los mismos metadatos
+        (playlist_metadata da un dict nuevo cuando cambia su generación).
+        """
+        if self._search is None or self._search[0] is not playlist \
+                or self._search[1] is not metadata:
+            def build():
+                texts = []
+                for i in range(len(playlist)):
+                    label, name = self.track_label(playlist, metadata, i)[0], playlist.title(i)
+                    texts.append(label if label == name else f"{label}\n{name}")
+                return PlaylistSearchIndex(texts)
+
+            self._search = (playlist, metadata, self._search_pool.submit(build))
+        return self._search[2]
+
+    # --- Precarga en segundo plano ---
+    def prefetch(self):
+        """
+        Deja listo lo que necesitan los atajos: canción actual, playlist
+        parseada, metadatos e índice de búsqueda. Así Alt+Num0 y
+        Alt+NumEnter solo tienen que pintar. Corre en el hilo de fondo del
+        despachador; la biblioteca se actualiza aparte, en otro trabajo.
+        """
+        with tracer.span("prefetch"):
+            playlist_path = self.get_vlc_playlist_path(verbose=False)
+            if self.dispatcher:
+                self.schedule_library_refresh(playlist_path)
+            if self.file_watcher is not None:
+                self.file_watcher.watch([current_song_cache.ini_path, playlist_path])
+            current_song_cache.get()
+            if not playlist_path:
+                return
+            playlist = self.playlist_cache.get(playlist_path)
+            if playlist:
+                self.search_index(playlist, self.playlist_metadata(playlist))
+                if self.skip_duplicates:
+                    duplicate_finder.canonical(self.playlist_files(playlist))  # llena la caché de hashes
+
+    def schedule_library_refresh(self, playlist_path) -> bool:
+        """
+        Pide reindexar la biblioteca al arrancar, al cambiar o guardarse la
+        playlist activa y, si no, como mucho cada LIBRARY_REFRESH_INTERVAL.
+        """
+        now = time.monotonic()
+        last = self._library_refresh
+        if not self._library_stale and last is not None and last[0] == playlist_path \
+                and now - last[1] < LIBRARY_REFRESH_INTERVAL:
+            return False
+        self._library_refresh = (playlist_path, now)
+        self._library_stale = False
+        return self.dispatcher.background("library", self.refresh_library)
+
+    def on_watched_change(self, paths):
+        """Del FileWatcher: precarga de nuevo; si no es solo el INI, también la biblioteca."""
+        ini_path = str(current_song_cache.ini_path)
+        if any(path != ini_path for path in paths):
+            self._library_stale = True
+        self.dispatcher.background("prefetch", self.prefetch)
+
+    def refresh_library(self):
+        """Vuelve a indexar solo las playlists de la biblioteca que han cambiado."""
+        try:
+            with tracer.span("library.refresh"):
+                self.library.refresh()
+        except Exception as e:
+            print(f"[X] Error indexando la biblioteca: {e}")
+
+    def start_prefetch(self):
+        """Vigila el INI de VLC y la playlist activa y precarga al cambiar."""
+        self.file_watcher = FileWatcher(self.on_watched_change)
+        self.file_watcher.start()
+        self.dispatcher.background("prefetch", self.prefetch)
+
     # --- Cerrar VLC y reproducir carpeta MP3 ---
     def close_vlc_with_keyboard(self):
-        print("[STOP] Cerrando VLC y reproduciendo MP3 de la carpeta...")
-        close_vlc()
+        with self._vlc_lock:
+            print("[STOP] Cerrando VLC y reproduciendo MP3 de la carpeta...")
+            with tracer.span("folder.close_vlc"):
+                close_vlc()
 
-        try:
-            import win32com.client
-            shell = win32com.client.Dispatch("Shell.Application")
-            hwnd = win32gui.GetForegroundWindow()
-            for window in shell.Windows():
-                if window.hwnd == hwnd:
-                    folder = window.Document.Folder
-                    folder_path = folder.Self.Path
-                    mp3_files = sorted([f for f in os.listdir(folder_path)
-                                        if f.lower().endswith('.mp3')])
-                    if not mp3_files:
-                        self.show_custom_tooltip("(!) Carpeta sin MP3")
-                        return
+            try:
+                import pythoncom
+                import win32com.client
+                pythoncom.CoInitialize()  # se ejecuta en un hilo del pool
+                with tracer.span("folder.explorer"):
+                    shell = win32com.client.Dispatch("Shell.Application")
+                    hwnd = win32gui.GetForegroundWindow()
+                    folder_path = None
+                    for window in shell.Windows():
+                        if window.hwnd == hwnd:
+                            folder_path = window.Document.Folder.Self.Path
+                            break
+                if not folder_path:
+                    return  # la ventana activa no es una carpeta del Explorador
+
+                with tracer.span("folder.scan"):
+                    mp3_files = folder_index.files(folder_path)
+                if self.skip_duplicates:
+                    with tracer.span("folder.dedupe"):
+                        mp3_files = duplicate_finder.unique(mp3_files)
+                if not mp3_files:
+                    self.ui(self.show_custom_tooltip, "(!) Carpeta sin MP3")
+                    return
 
+                with tracer.span("folder.find_vlc"):
                     vlc = find_vlc()
-                    if not vlc:
-                        self.show_custom_tooltip("[X] VLC no encontrado")
-                        return
-
-                    full_paths = [os.path.join(folder_path, f) for f in mp3_files]
-                    subprocess.Popen([vlc] + full_paths,
-                                     cwd=os.path.dirname(vlc))
-                    self.show_custom_tooltip(f"> {len(mp3_files)} MP3 encolados")
+                if not vlc:
+                    self.ui(self.show_custom_tooltip, "[X] VLC no encontrado")
                     return
-        except Exception as e:
-            print(f"[X] Error: {e}")
-            self.show_custom_tooltip("[X] No se pudo leer la carpeta")
+
+                with tracer.span("folder.materialize"):
+                    queue = self.folder_queue(mp3_files)
+                    folder_playlist = queue.materialize(self.queue_file(queue))
+                with tracer.span("folder.launch"):
+                    launch_vlc([folder_playlist] + VLC_RC_ARGS)
+                self.ui(self.show_custom_tooltip, f"> {len(mp3_files)} MP3 encolados")
+                return
+            except Exception as e:
+                print(f"[X] Error: {e}")
+                self.ui(self.show_custom_tooltip, "[X] No se pudo leer la carpeta")
+
+    def play_playlist_index(self, playlist_path: str, playlist: Playlist, idx: int):
+        """
+        Salta a la pista 'idx'. Si VLC tiene la interfaz RC activa basta un
+        'goto'; si no, se relanza VLC empezando por esa pista.
+        """
+        with tracer.span("select.queue"):
+            queue = self.queue_for(playlist_path, playlist)
+            queue.jump(queue.position_in_file(idx))
+        # El goto solo vale si VLC tiene este mismo archivo tal cual: una
+        # cola recién creada para otra playlist no está 'dirty' pero VLC no
+        # la ha cargado
+        if not queue.dirty and self.vlc_has_playlist(queue.path):
+            with tracer.span("select.remote_goto"):
+                jumped = vlc_remote.goto(idx)
+            if jumped:
+                self.ui(self.show_custom_tooltip, f"> {playlist[idx]['title']}")
+                return
+
+        if self.launch_queue(queue, "select"):
+            self.ui(self.show_custom_tooltip, f"> {playlist[idx]['title']}")
+
+    def play_library_track(self, tid: int):
+        """Reproduce una pista de la búsqueda en la biblioteca desde su playlist."""
+        playlists = self.library.playlists_of(tid)
+        if not playlists:
+            self.ui(self.show_custom_tooltip, "[Mus] La pista ya no está en ninguna playlist")
+            return
+        playlist_path = playlists[0]
+        playlist = self.playlist_cache.get(playlist_path)
+        try:
+            idx = self.library.position(playlist_path, tid)
+        except (KeyError, ValueError):
+            idx = len(playlist)
+        if idx >= len(playlist):  # la playlist ha cambiado desde que se indexó
+            self.ui(self.show_custom_tooltip, "[Mus] Playlist modificada, prueba de nuevo")
+            return
+        self.play_playlist_index(playlist_path, playlist, idx)
+
+    # --- Cola de reproducción ---
+    def queue_for(self, playlist_path: str, playlist: Playlist) -> PlayQueue:
+        """
+        La cola actual si VLC sigue con el archivo que se le dio; si no,
+        una nueva con el orden de 'playlist_path'.
+        """
+        queue = self.play_queue
+        if queue is None or not queue.matches(playlist_path, len(playlist)):
+            order = aliases = None
+            if self.skip_duplicates:
+                # Las repetidas salen de la cola; elegirlas en el selector
+                # salta a la primera copia
+                with tracer.span("queue.dedupe"):
+                    canon = duplicate_finder.canonical(self.playlist_files(playlist))
+                order = [i for i, j in enumerate(canon) if i == j]
+                aliases = {i: j for i, j in enumerate(canon) if i != j}
+            queue = self.play_queue = PlayQueue(
+                playlist, lambda items, out: xspf_rotator.write_order(playlist_path, items, out),
+                source=playlist_path, order=order, aliases=aliases)
+        return queue
+
+    @staticmethod
+    def playlist_files(playlist: Playlist) -> list[str]:
+        return [decode_uri(playlist.location(i)) for i in range(len(playlist))]
+
+    def folder_queue(self, files: list[str]) -> PlayQueue:
+        tracks = Playlist({'title': Path(f).stem, 'location': f} for f in files)
+        self.play_queue = PlayQueue(
+            tracks, lambda items, out: folder_index.write_xspf([files[i] for i in items], out))
+        return self.play_queue
+
+    @staticmethod
+    def queue_file(queue: PlayQueue) -> str:
+        if queue.source is None:
+            return os.path.join(tempfile.gettempdir(), FOLDER_QUEUE_FILE)
+        paths = (os.path.join(tempfile.gettempdir(), name) for name in QUEUE_FILES)
+        return next(path for path in paths if path != queue.source)
+
+    def launch_queue(self, queue: PlayQueue, stage: str) -> bool:
+        """Relanza VLC con la cola desde la pista actual, respetando su ventana."""
+        with self._vlc_lock:
+            with tracer.span(f"{stage}.window_state"):
+                vlc_state = get_vlc_window_state()
+            with tracer.span(f"{stage}.close_vlc"):
+                close_vlc()
+            with tracer.span(f"{stage}.find_vlc"):
+                vlc = find_vlc()
+            if not vlc:
+                self.ui(self.show_custom_tooltip, "[X] VLC no encontrado")
+                return False
+
+            with tracer.span(f"{stage}.materialize"):
+                queue_path = queue.materialize(self.queue_file(queue))
+            with tracer.span(f"{stage}.launch"):
+                if vlc_state in ("minimized", "background"):
+                    return launch_vlc([queue_path, "--qt-start-minimized"] + VLC_RC_ARGS)
+                return launch_vlc([queue_path] + VLC_RC_ARGS)
+
+    def run_selection(self, work, *args):
+        """
+        Ejecuta una elección del selector en el hilo del selector. No se
+        agrupa como los atajos: cada clic es una pista distinta y se
+        atienden todos, en orden.
+        """
+        def report(future):
+            error = future.exception()
+            if error is not None:
+                print(f"[X] Error en 'select': {error}")
+                self.ui(self.show_custom_tooltip, "[X] No se pudo reproducir")
+
+        future = self._selector_pool.submit(work, *args)
+        future.add_done_callback(report)
+        return future
+
+    def queue_playlist_index(self, playlist_path: str, playlist: Playlist, idx: int,
+                             play_next: bool) -> str:
+        """
+        Pone la pista 'idx' del selector a continuación o al final de la
+        cola. VLC la recibe al terminar la pista actual (on_queue_song_changed).
+        """
+        queue = self.queue_for(playlist_path, playlist)
+        item = queue.item_in_file(idx)
+        if play_next:
+            queue.play_next(item)
+            return "» a continuación"
+        queue.enqueue(item)
+        return f"+ en cola ({len(queue)})"
+
+    def on_queue_song_changed(self, name: str):
+        """
+        Desde NowPlayingService: sigue a VLC en la cola y, si la cola tiene
+        cambios que VLC no conoce, lo relanza con ella al cambiar de pista.
+        """
+        queue = self.play_queue
+        if queue is None:
+            return
+        if not queue.dirty:
+            queue.sync(name)
+        elif self.dispatcher:
+            self.dispatcher.submit("queue", lambda: self.apply_queue(name))
+
+    def apply_queue(self, name: str):
+        """
+        Relanza VLC con la cola si 'name' es la pista que tocaba tras la
+        actual. Si se ha saltado a otra a mano se sigue a VLC sin relanzar:
+        la cola se aplica en el siguiente cambio de pista.
+        """
+        with self._vlc_lock:
+            queue = self.play_queue
+            if queue is None:
+                return
+            if not queue.dirty or not queue.follows(name):
+                queue.sync(name)
+                return
+            queue.advance()  # la pista que acaba de terminar en VLC
+            self.launch_queue(queue, "queue")
 
     # --- Selector gráfico de playlist ---
     def show_playlist_selector(self):
-        playlist_path = self.get_vlc_playlist_path()
+        """Carga la playlist (puede bloquear) y abre el selector en Tk."""
+        with tracer.span("selector.playlist_path"):
+            playlist_path = self.get_vlc_playlist_path()
         if not playlist_path:
-            self.show_custom_tooltip("[Mus] No se encontró playlist activa")
+            self.ui(self.show_custom_tooltip, "[Mus] No se encontró playlist activa")
             return
  
-        playlist = self.read_xspf_playlist(playlist_path)
+        with tracer.span("selector.load_playlist"):
+            playlist = self.playlist_cache.get(playlist_path)
         if not playlist:
-            self.show_custom_tooltip("[Mus] Playlist vacía")
+            self.ui(self.show_custom_tooltip, "[Mus] Playlist vacía")
             return
- 
+
+        with tracer.span("selector.current_song"):
+            actual = get_current_song()
+        with tracer.span("selector.metadata"):
+            metadata = self.playlist_metadata(playlist)
+        self.ui(self.open_playlist_selector, playlist_path, playlist, actual, metadata)
+
+    def playlist_metadata(self, playlist: Playlist) -> dict:
+        """
+        Títulos/duraciones de la caché SQLite por índice de pista. Se
+        consulta en bloque una vez por playlist (y de nuevo si un escaneo
+        ha guardado cambios); lo que falte se escanea en segundo plano.
+        """
+        try:
+            if self.metadata_cache is None:
+                self.metadata_cache = MetadataCache()
+            cache = self.metadata_cache
+            same_playlist = self._metadata is not None and self._metadata[0] is playlist
+            if same_playlist and self._metadata[1] == cache.generation:
+                return self._metadata[2]
+
+            generation = cache.generation
+            paths = self.playlist_files(playlist)
+            found = cache.lookup(paths)
+            metadata = {i: found[p] for i, p in enumerate(paths) if p in found}
+            self._metadata = (playlist, generation, metadata)
+            if not same_playlist:
+                # Rellena lo que falte y detecta archivos modificados
+                cache.scan_async(paths)
+            return metadata
+        except Exception as e:
+            print(f"[X] Error leyendo metadatos: {e}")
+            return {}
+
+    def open_playlist_selector(self, playlist_path: str, playlist: Playlist, actual: str,
+                               metadata: dict | None = None):
+        with tracer.span("selector.build_widgets"):
+            self._build_playlist_selector(playlist_path, playlist, actual, metadata)
+        print("[GUI] Playlist selector abierto.")
+
+    def _build_playlist_selector(self, playlist_path, playlist, actual, metadata):
         self.close_tooltip()
         if self.playlist_window:
             try:
@@ -344,22 +3165,51 @@ class VLCController:
         # --- Header moderno (NO draggable) ---
         header = tk.Frame(outer, bg="#262626")
         header.pack(fill=tk.X)
-        actual = get_current_song()
-        tk.Label(
+        header_label = tk.Label(
             header,
             text=actual,
             fg="#EDEDED",
             bg="#262626",
             font=("Calibri", 15, "bold"),
             pady=6
-        ).pack(side=tk.LEFT, padx=10)
+        )
+        header_label.pack(side=tk.LEFT, padx=10)
+        filter_label = tk.Label(header, text="", fg="#8A8A8A", bg="#262626",
+                                font=("Calibri", 10, "bold"))
+        filter_label.pack(side=tk.RIGHT, padx=10)
+        search = self.search_index(playlist, metadata)
  
         # --- Área de lista ---
         list_frame = tk.Frame(outer, bg="#1A1A1A", bd=0)
         list_frame.pack(padx=5, pady=5)
         
-        listbox = tk.Listbox(
-            list_frame, font=tkfont.Font(family="Calibri", size=10, weight="bold"),
+        # --- Items con estilo zebra (solo se pintan las filas visibles) ---
+        view = None  # índices filtrados o None = todas las pistas
+        query = ""
+        in_library = False  # Tab: buscar en todas las playlists (ids de pista)
+
+        metadata = metadata or {}
+
+        def render_row(i):
+            if in_library:
+                tid = view[i]
+                count = len(self.library.playlists_of(tid))
+                return (f"● {self.library.title(tid)}  [{count}]", "#9FD3FF",
+                        "#151515" if i % 2 else "#101010")
+            j = view[i] if view is not None else i
+            name = playlist.title(j)
+            label, duration = self.track_label(playlist, metadata, j)
+            icon = "●"  # punto redondo unicode
+            text = f"{icon} {label}"
+            if duration:
+                text += f"  ({duration // 60000}:{duration // 1000 % 60:02d})"
+            return (text,
+                    "#40FF40" if name == actual else "#FFFFFF",
+                    "#151515" if i % 2 else "#101010")
+
+        listbox = VirtualListbox(
+            list_frame, len(playlist), render_row,
+            font=tkfont.Font(family="Calibri", size=10, weight="bold"),
             bg="#101010", fg="#F3F3F3", selectbackground="#2E8B57",
             selectforeground="#FFFFFF", width=50, height=15,
             activestyle="none"
@@ -375,49 +3225,99 @@ class VLCController:
         
         # -- conectar set del listbox con la scrollbar --
         listbox.configure(yscrollcommand=premium_scroll.set)
-        # --- Items con estilo zebra ---
-        for i, track in enumerate(playlist, 1):
-            name = track['title']
-            icon = "●"  # punto redondo unicode
-            idx = listbox.size()
-            
-            listbox.insert(tk.END, f"{icon} {name}")
-            
-            # Colorear según estado
-            listbox.itemconfig(
-                idx,
-                fg="#40FF40" if name == actual else "#FFFFFF"
-            )           
-            if i % 2 == 0:
-                listbox.itemconfig(tk.END, bg="#151515")
+
+        # --- Filtrar tecleando ---
+        def on_key(event):
+            nonlocal view, query, in_library
+            if event.keysym == "Tab":
+                in_library = not in_library
+            elif event.keysym == "BackSpace":
+                if not query:
+                    return "break"
+                query = query[:-1]
+            elif event.char and event.char.isprintable() and not event.state & 0x4:
+                query += event.char
+            else:
+                return None
+            apply_filter()
+            return "break"
+
+        def apply_filter():
+            nonlocal view
+            if in_library:
+                view = self.library.search(query)
+                filter_label.config(text=f"[biblioteca] /{query}")
+            elif not search.done():
+                # No bloquear Tk: se filtra cuando el índice esté listo
+                filter_label.config(text=f"/{query} (indexando…)" if query else "")
+                return
+            elif search.exception() is not None:
+                filter_label.config(text="(búsqueda no disponible)" if query else "")
+                return
+            else:
+                view = search.result().search(query)
+                filter_label.config(text=f"/{query}" if query else "")
+            listbox.set_count(len(playlist) if view is None else len(view))
+
+        def on_index_ready():
+            try:
+                if query and not in_library and w.winfo_exists():
+                    apply_filter()
+            except tk.TclError:
+                pass  # el selector ya se cerró
+
+        listbox.bind("<KeyPress>", on_key)
+        if not search.done():
+            search.add_done_callback(lambda _: self.ui(on_index_ready))
+
+        def on_song_changed(name):
+            nonlocal actual
+            actual = name
+            header_label.config(text=name)
+            listbox.redraw()
+
+        self._selector_song_changed = on_song_changed
  
         def on_select(event):
             sel = listbox.curselection()
             if not sel:
                 return
  
-            idx = sel[0]
-            vlc_state = get_vlc_window_state()
- 
-            close_vlc()
-            vlc = find_vlc()
-            if not vlc:
-                self.show_custom_tooltip("[X] VLC no encontrado")
-                return
- 
-            rotated_path = build_rotated_xspf(playlist_path, idx)
- 
-            if vlc_state in ("minimized", "background"):
-                subprocess.Popen([vlc, rotated_path, "--qt-start-minimized"],
-                                 cwd=os.path.dirname(vlc))
+            if in_library:
+                self.run_selection(self.play_library_track, view[sel[0]])
             else:
-                subprocess.Popen([vlc, rotated_path], cwd=os.path.dirname(vlc))
- 
-            self.show_custom_tooltip(f"> {playlist[idx]['title']}")
+                idx = view[sel[0]] if view is not None else sel[0]
+                self.run_selection(self.play_playlist_index, playlist_path, playlist, idx)
             w.destroy()
  
         listbox.bind("<<ListboxSelect>>", on_select)
 
+        # --- Clic derecho: a continuación; clic central: al final ---
+        def on_queue(event, play_next):
+            i = listbox.nearest(event.y)
+            if in_library or not 0 <= i < listbox.size():
+                return "break"
+            idx = view[i] if view is not None else i
+            # Con VLC_DEDUPE la primera cola hashea la playlist: fuera del hilo de Tk
+            future = self._selector_pool.submit(self.queue_playlist_index,
+                                             playlist_path, playlist, idx, play_next)
+            future.add_done_callback(lambda f: self.ui(on_queued, f))
+            return "break"
+
+        def on_queued(future):
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"[X] Error encolando: {e}")
+                text = "(no se pudo encolar)"
+            try:
+                filter_label.config(text=text)
+            except tk.TclError:
+                pass  # el selector ya se cerró
+
+        listbox.bind("<Button-3>", lambda e: on_queue(e, True))
+        listbox.bind("<Button-2>", lambda e: on_queue(e, False))
+
         # --- Posicionamiento inferior derecha ---
         w.update_idletasks()
         ww, hh = w.winfo_reqwidth(), w.winfo_reqheight()
@@ -431,54 +3331,99 @@ class VLCController:
         w.bind("<Escape>", lambda e: w.destroy())
         w.bind("<FocusOut>", lambda e: w.destroy())
 
-        print("[GUI] Playlist selector abierto.")
 
 
-import win32process
+class Win32WindowBackend:
+    """Acceso a las ventanas de Windows con pywin32 (ver VLCWindowService)."""
 
+    def windows(self) -> list:
+        # Se recorren todas: devolver False desde el callback hace que
+        # pywin32 lance una excepción en lugar de parar sin más.
+        hwnds = []
+        win32gui.EnumWindows(lambda hwnd, acc: acc.append(hwnd) or True, hwnds)
+        return hwnds
 
-def get_vlc_window_state():
+    def is_window(self, hwnd) -> bool:
+        return bool(win32gui.IsWindow(hwnd))
+
+    def is_visible(self, hwnd) -> bool:
+        return bool(win32gui.IsWindowVisible(hwnd))
+
+    def window_pid(self, hwnd) -> int:
+        return win32process.GetWindowThreadProcessId(hwnd)[1]
+
+    def is_minimized(self, hwnd) -> bool:
+        return bool(win32gui.IsIconic(hwnd))
+
+    def is_maximized(self, hwnd) -> bool:
+        return win32gui.GetWindowPlacement(hwnd)[1] == win32con.SW_SHOWMAXIMIZED
+
+
+class VLCWindowService:
     """
-    Devuelve el estado de la ventana de VLC:
-    'minimized', 'maximized', 'normal', 'background'
+    Recuerda el HWND de la ventana de VLC y lo valida con IsWindow, el PID
+    propietario y que siga visible; solo recorre todas las ventanas cuando
+    esa comprobación falla. 'backend' es cualquier objeto con la interfaz
+    de Win32WindowBackend, así que la caché se puede probar sin Windows.
     """
-    vlc_pid = None
-    for proc in psutil.process_iter(['pid', 'name']):
-        if proc.info['name'] and 'vlc.exe' in proc.info['name'].lower():
-            vlc_pid = proc.info['pid']
-            break
 
-    if not vlc_pid:
+    def __init__(self, backend=None, tracker=None):
+        self.backend = backend or Win32WindowBackend()
+        self.tracker = tracker or vlc_tracker
+        self._hwnd = None
+        self.hits = 0
+        self.misses = 0
+
+    def _valid(self, hwnd, pid) -> bool:
+        backend = self.backend
+        return (backend.is_window(hwnd) and backend.window_pid(hwnd) == pid
+                and backend.is_visible(hwnd))
+
+    def find_window(self, pid):
+        if self._hwnd is not None and self._valid(self._hwnd, pid):
+            self.hits += 1
+            return self._hwnd
+
+        self.misses += 1
+        self._hwnd = None
+        backend = self.backend
+        for hwnd in backend.windows():
+            if backend.is_visible(hwnd) and backend.window_pid(hwnd) == pid:
+                self._hwnd = hwnd
+                break
+        return self._hwnd
+
+    def state(self) -> str:
+        """
+        Devuelve el estado de la ventana de VLC:
+        'minimized', 'maximized', 'normal', 'background'
+        """
+        vlc_pid = self.tracker.find_pid()
+        if not vlc_pid:
+            return "normal"
+
+        vlc_hwnd = self.find_window(vlc_pid)
+        if not vlc_hwnd:
+            return "background"
+        if self.backend.is_minimized(vlc_hwnd):
+            return "minimized"
+        if self.backend.is_maximized(vlc_hwnd):
+            return "maximized"
         return "normal"
 
-    foreground_hwnd = win32gui.GetForegroundWindow()
-    vlc_hwnd = None
-
-    def enum_windows_callback(hwnd, state):
-        if win32gui.IsWindowVisible(hwnd):
-            _, found_pid = win32process.GetWindowThreadProcessId(hwnd)
-            if found_pid == vlc_pid:
-                state.append(hwnd)
-                return False  # detener búsqueda
-        return True
-
-    state = []
-    win32gui.EnumWindows(enum_windows_callback, state)
-    vlc_hwnd = state[0] if state else None
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
 
-    if not vlc_hwnd:
-        return "background"
 
-    if win32gui.IsIconic(vlc_hwnd):
-        return "minimized"
+window_service = VLCWindowService()
 
-    placement = win32gui.GetWindowPlacement(vlc_hwnd)
-    show_cmd = placement[1]
 
-    if show_cmd == win32con.SW_SHOWMAXIMIZED:
-        return "maximized"
-    else:
-        return "normal"
+def get_vlc_window_state():
+    """
+    Devuelve el estado de la ventana de VLC:
+    'minimized', 'maximized', 'normal', 'background'
+    """
+    return window_service.state()
 
 # ---------------- Clase de scrollbar ----------------
 class ThinScrollbar(tk.Canvas):
@@ -612,6 +3557,140 @@ class ThinScrollbar(tk.Canvas):
 
 # ---------------- Fin de clase ----------------
 
+# ---------------- Lista virtualizada ----------------
+class VirtualListbox(tk.Listbox):
+    """
+    Listbox que solo contiene tantas filas como caben en pantalla ('height')
+    y las reasigna al hacer scroll. 'render(i)' devuelve (texto, fg, bg)
+    de la fila i, así que el coste de abrir la ventana no depende del
+    número de pistas.
+
+    Expone la misma interfaz que usa ThinScrollbar (size, yview_moveto,
+    yview_scroll, yscrollcommand) y curselection() devuelve índices
+    absolutos, como un Listbox normal.
+    """
+
+    def __init__(self, parent, count, render, height=15, **kwargs):
+        self._yscroll = kwargs.pop("yscrollcommand", None)
+        super().__init__(parent, height=height, **kwargs)
+        self._count = count
+        self._render = render
+        self._rows = height
+        self._top = 0
+
+        self.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.bind("<Down>", lambda e: self._on_arrow(1))
+        self.bind("<Prior>", lambda e: self._on_key_scroll(-1, "pages"))
+        self.bind("<Next>", lambda e: self._on_key_scroll(1, "pages"))
+        self.bind("<Home>", lambda e: self._on_key_moveto(0.0))
+        self.bind("<End>", lambda e: self._on_key_moveto(1.0))
+
+        self._refresh()
+
+    # --- Interfaz tipo Listbox ---
+    def configure(self, cnf=None, **kwargs):
+        # yscrollcommand lo gestiona la lista virtual, no Tk
+        if cnf and "yscrollcommand" in cnf:
+            cnf = dict(cnf)
+            kwargs["yscrollcommand"] = cnf.pop("yscrollcommand")
+        if "yscrollcommand" not in kwargs:
+            return super().configure(cnf, **kwargs)
+        self._yscroll = kwargs.pop("yscrollcommand")
+        self._notify_scroll()
+        if cnf or kwargs:
+            return super().configure(cnf, **kwargs)
+        return None
+
+    config = configure
+
+    def size(self):
+        return self._count
+
+    def set_count(self, count):
+        """Cambia el número de filas (p. ej. al filtrar) y vuelve arriba."""
+        self._count = count
+        self._top = 0
+        super().selection_clear(0, tk.END)
+        self._refresh()
+
+    def redraw(self):
+        """Vuelve a pintar las filas visibles (p. ej. al cambiar la pista actual)."""
+        self._refresh()
+
+    def curselection(self):
+        return tuple(self._top + int(slot) for slot in super().curselection())
+
+    def nearest(self, y):
+        return self._top + super().nearest(y)
+
+    def yview_moveto(self, fraction):
+        self._set_top(int(float(fraction) * self._count))
+
+    def yview_scroll(self, number, what):
+        step = self._rows if what == "pages" else 1
+        self._set_top(self._top + int(number) * step)
+
+    def see(self, index):
+        if index < self._top:
+            self._set_top(index)
+        elif index >= self._top + self._rows:
+            self._set_top(index - self._rows + 1)
+
+    # --- Internos ---
+    def _set_top(self, top):
+        top = max(0, min(top, self._count - self._rows))
+        if top != self._top:
+            # Índices absolutos con el _top de antes: la selección sigue a la
+            # pista, no a la fila de la pantalla
+            selected = self.curselection()
+            self._top = top
+            self._refresh(selected)
+
+    def _refresh(self, selected=None):
+        if selected is None:
+            selected = self.curselection()
+        super().delete(0, tk.END)
+        visible = range(self._top, min(self._top + self._rows, self._count))
+        rows = [self._render(i) for i in visible]
+        if rows:
+            super().insert(0, *(text for text, _, _ in rows))
+        for slot, (_, fg, bg) in enumerate(rows):
+            self.itemconfig(slot, fg=fg, bg=bg)
+        for i in selected:
+            if self._top <= i < self._top + len(rows):
+                self.selection_set(i - self._top)
+        self._notify_scroll()
+
+    def _notify_scroll(self):
+        if self._yscroll and self._count:
+            first = self._top / self._count
+            last = min(1.0, (self._top + self._rows) / self._count)
+            self._yscroll(first, last)
+
+    def _on_arrow(self, delta):
+        slot = self.index("active")
+        if 0 <= slot + delta < min(self._rows, self._count):
+            return None  # movimiento normal dentro de la ventana
+        before = self._top
+        self.yview_scroll(delta, "units")
+        if self._top == before:
+            return "break"
+        super().selection_clear(0, tk.END)
+        self.selection_set(slot)
+        self.activate(slot)
+        self.event_generate("<<ListboxSelect>>")
+        return "break"
+
+    def _on_key_scroll(self, number, what):
+        self.yview_scroll(number, what)
+        return "break"
+
+    def _on_key_moveto(self, fraction):
+        self.yview_moveto(fraction)
+        return "break"
+
+# ---------------- Fin de lista virtualizada ----------------
+
 # ------------------------------------------------------------------
 #  Punto de entrada
 # ------------------------------------------------------------------
@@ -625,10 +3704,21 @@ def main():
     print("Alt+NumEnter -> Selector de playlist")
     print("Alt+Decimal  -> Cerrar VLC y reproducir carpeta MP3")
 
-    keyboard.add_hotkey('alt+num 0', controller.show_song_tooltip)
-    keyboard.add_hotkey('ctrl+alt+x', lambda: os._exit(0))
-    keyboard.add_hotkey('alt+num enter', controller.show_playlist_selector)
-    keyboard.add_hotkey('alt+decimal', controller.close_vlc_with_keyboard)
+    def salir():
+        tracer.dump()
+        os._exit(0)
+
+    dispatcher = controller.dispatcher
+    keyboard.add_hotkey('alt+num 0', dispatcher.hotkey("tooltip", controller.show_song_tooltip))
+    keyboard.add_hotkey('ctrl+alt+x', salir)
+    keyboard.add_hotkey('alt+num enter', dispatcher.hotkey("selector", controller.show_playlist_selector))
+    keyboard.add_hotkey('alt+decimal', dispatcher.hotkey("folder", controller.close_vlc_with_keyboard))
+    warm_up()
+    controller.start_prefetch()
+
+    now_playing.subscribe(lambda name: controller.ui(controller.on_song_changed, name))
+    now_playing.subscribe(controller.on_queue_song_changed)
+    now_playing.start()
 
     controller.root.mainloop()
 
@@ -0,0 +1,859 @@
+"""
+Benchmarks de los caminos calientes de VLC.py y getCanciones.py.
+
+Usa datos sintéticos (INI, XSPF, procesos, ventanas, árbol de carpetas) y
+sustituye los módulos de Windows por stubs, así que funciona en Linux.
+Cada ejecución se guarda en bench_results.json con el commit actual y se
+compara con la anterior:
+
+    python bench.py               # ejecuta, guarda y compara
+    python bench.py --check       # además sale con código 1 si hay regresiones
+                                  # (o si el tooltip deja hilos u objetos de Tk)
+    python bench.py --tracks 100000
+    python bench.py --folder-files 10000   # árbol de carpetas más pequeño
+    python bench.py --library     # además, escalado del índice de biblioteca
+    python bench.py --memory      # además, pico de memoria al leer XSPF grandes
+    xvfb-run python bench.py      # además, casos de interfaz (Tk)
+
+El arranque se mide con 'python -X importtime' sobre 'import VLC'. Los
+casos de interfaz necesitan pantalla (real o Xvfb) y sin ella se omiten.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+import types
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from urllib.parse import unquote
+
+HERE = Path(__file__).resolve().parent
+RESULTS_FILE = HERE / "bench_results.json"
+REGRESSION_RATIO = 1.25
+QUEUE_SIZE = 100000
+FILES_PER_FOLDER = 100
+METADATA_FILES = 100000
+SEARCH_TITLES = 100000
+FIRST_PAINT_TRACKS = (1000, 10000, 100000)
+TOOLTIP_UPDATES = 1000  # a 1000 por segundo
+MEMORY_TRACKS = (50000, 100000, 200000)
+
+
+# ============================================================
+# Stubs para importar VLC.py fuera de Windows
+# ============================================================
+def install_stubs():
+    for name in ("winreg", "win32gui", "win32con", "win32process", "keyboard", "psutil"):
+        try:
+            __import__(name)
+        except ImportError:
+            sys.modules[name] = types.ModuleType(name)
+
+    psutil = sys.modules["psutil"]
+    if not hasattr(psutil, "process_iter"):
+        class NoSuchProcess(Exception):
+            pass
+
+        def missing_process(pid):
+            raise NoSuchProcess(pid)
+
+        psutil.NoSuchProcess = NoSuchProcess
+        psutil.AccessDenied = type("AccessDenied", (Exception,), {})
+        psutil.process_iter = lambda attrs=None: iter(())
+        psutil.Process = missing_process
+
+    win32con = sys.modules["win32con"]
+    if not hasattr(win32con, "SW_SHOWMAXIMIZED"):
+        win32con.SW_SHOWMAXIMIZED = 3
+    winreg = sys.modules["winreg"]
+    if not hasattr(winreg, "HKEY_LOCAL_MACHINE"):
+        winreg.HKEY_LOCAL_MACHINE = 0
+
+    sys.path.insert(0, str(HERE))
+
+
+# ============================================================
+# Datos sintéticos
+# ============================================================
+def make_xspf(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<playlist xmlns="http://xspf.org/ns/0/" '
+                'xmlns:vlc="http://www.videolan.org/vlc/playlist/ns/0/" version="1">\n'
+                '\t<title>Lista</title>\n\t<trackList>\n')
+        for i in range(n):
+            title = f"\t\t\t<title>Canción {i}</title>\n" if i % 3 else ""
+            f.write(f"\t\t<track>\n\t\t\t<location>file:///C:/M%C3%BAsica/Album%20{i // 12}/"
+                    f"pista%20{i}.mp3</location>\n{title}\t\t\t<duration>{180000 + i}</duration>\n"
+                    '\t\t\t<extension application="http://www.videolan.org/vlc/playlist/0">\n'
+                    f"\t\t\t\t<vlc:id>{i}</vlc:id>\n\t\t\t</extension>\n\t\t</track>\n")
+        f.write('\t</trackList>\n\t<extension application="http://www.videolan.org/vlc/playlist/0">\n')
+        f.write("".join(f'\t\t<vlc:item tid="{i}"/>\n' for i in range(n)))
+        f.write("\t</extension>\n</playlist>\n")
+
+
+def make_ini(path, recents):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[General]\nqt-privacy-ask=false\n\n[MainWindow]\n")
+        f.write("".join(f"key{i}=@ByteArray(value{i})\n" for i in range(2000)))
+        f.write("\n[RecentsMRL]\nlist=")
+        f.write(", ".join(f'"file:///C:/M%C3%BAsica/pista%20{i}.mp3"' for i in range(recents)))
+        f.write("\ntimes=" + ", ".join("0" for _ in range(recents)) + "\n")
+
+
+def make_tree(root, dirs, files_per_dir):
+    for d in range(dirs):
+        folder = os.path.join(root, f"Album {d}")
+        os.makedirs(folder)
+        for i in range(files_per_dir):
+            ext = ".mp3" if i % 4 else ".jpg"
+            open(os.path.join(folder, f"pista {i}{ext}"), "w").close()
+
+
+def make_dupe_tree(root, files=400, seed=0):
+    """
+    Árbol con ~1/4 de copias exactas, tamaños muy repetidos (para que la
+    etapa de tamaño no baste) y algunos archivos que solo difieren en
+    medio (obligan al hash completo). Devuelve (rutas, bytes totales).
+    """
+    import random
+    rng = random.Random(seed)
+    sizes = [rng.randrange(150_000, 600_000) for _ in range(40)]
+    originals, paths, total = [], [], 0
+    for i in range(files):
+        folder = os.path.join(root, f"Album {i % 20}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"pista {i}.mp3")
+        if originals and i % 4 == 0:
+            data = rng.choice(originals)  # copia exacta con otro nombre
+        elif originals and i % 13 == 0:
+            data = bytearray(rng.choice(originals))
+            data[len(data) // 2] ^= 0xFF  # misma cabecera y cola
+        else:
+            data = rng.randbytes(rng.choice(sizes))
+            originals.append(data)
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+        total += len(data)
+    return paths, total
+
+
+def make_library(root, playlists, entries, seed=0):
+    """
+    'playlists' XSPF con 'entries' pistas en total, elegidas de un fondo de
+    entries // 4 canciones, así que la misma pista aparece en varias.
+    """
+    import random
+    rng = random.Random(seed)
+    songs = entries // 4
+    per_playlist = entries // playlists
+    for p in range(playlists):
+        folder = os.path.join(root, f"Listas {p % 10}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"lista {p}.xspf"), "w", encoding="utf-8") as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<playlist xmlns="http://xspf.org/ns/0/" version="1">\n\t<trackList>\n')
+            for _ in range(per_playlist):
+                s = rng.randrange(songs)
+                f.write(f"\t\t<track><location>file:///C:/M%C3%BAsica/Artista%20{s % 997}/"
+                        f"pista%20{s}.mp3</location><title>Canción {s} artista {s % 997}"
+                        "</title></track>\n")
+            f.write("\t</trackList>\n</playlist>\n")
+
+
+class FakeProcess:
+    def __init__(self, pid, name):
+        self.pid = pid
+        self.info = {"pid": pid, "name": name, "create_time": 1000.0 + pid}
+
+    def create_time(self):
+        return self.info["create_time"]
+
+    def cmdline(self):
+        return [self.info["name"]]
+
+
+class FakeWindowBackend:
+    """Tabla de ventanas sintética con la interfaz de Win32WindowBackend."""
+
+    def __init__(self, count, vlc_pid):
+        self.pids = {hwnd: 100 + hwnd % 500 for hwnd in range(1, count + 1)}
+        self.pids[count] = vlc_pid  # la de VLC, al final del recorrido
+        self.maximized = {count}
+
+    def windows(self):
+        return list(self.pids)
+
+    def is_window(self, hwnd):
+        return hwnd in self.pids
+
+    def is_visible(self, hwnd):
+        return True
+
+    def window_pid(self, hwnd):
+        return self.pids[hwnd]
+
+    def is_minimized(self, hwnd):
+        return False
+
+    def is_maximized(self, hwnd):
+        return hwnd in self.maximized
+
+
+# ============================================================
+# Servidor RC falso
+# ============================================================
+class FakeVLCServer:
+    """
+    Imita la interfaz RC de VLC (--extraintf=rc) en 127.0.0.1 con un
+    puerto libre: saludo, prompt '> ', 'goto N', 'status' e 'is_playing'.
+    Guarda los comandos recibidos y drop() corta las conexiones abiertas
+    para probar la reconexión.
+    """
+    def __init__(self, current="file:///C:/M%C3%BAsica/pista%201.mp3"):
+        self.current = current
+        self.commands = []
+        self.connections = 0
+        self._clients = []
+        self._closed = False
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            if self._closed:
+                conn.close()
+                return
+            self.connections += 1
+            self._clients.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _reply(self, line):
+        self.commands.append(line)
+        if line.startswith("goto "):
+            return ""
+        if line == "status":
+            return f"( new input: {self.current} )\r\n( audio volume: 256 )\r\n( state playing )"
+        if line == "is_playing":
+            return "1"
+        return f"Unknown command `{line}'. Type `help' for help."
+
+    def _serve(self, conn):
+        try:
+            conn.sendall(b"VLC media player 3.0.20 Vetinari\r\nRemote control interface initialized.\r\n> ")
+            buffer = b""
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                buffer += chunk
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    reply = self._reply(line.decode().strip())
+                    conn.sendall((reply + "\r\n> " if reply else "> ").encode())
+        except OSError:
+            pass
+
+    def drop(self):
+        for conn in self._clients:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
+        self._clients.clear()
+
+    def close(self):
+        # En Linux close() no despierta al hilo bloqueado en accept(): el
+        # socket seguiría aceptando conexiones hasta la siguiente
+        self._closed = True
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        self.drop()
+
+
+# ============================================================
+# Implementaciones de referencia (las de antes, para comparar)
+# ============================================================
+def read_xspf_etree(playlist_path):
+    """VLCController.read_xspf_playlist antes de iter_xspf_tracks: ET.parse entero."""
+    playlist = []
+    tree = ET.parse(playlist_path)
+    root = tree.getroot()
+    ns = {'ns': 'http://xspf.org/ns/0/'}
+    for track in root.findall('.//ns:track', ns):
+        location = track.find('ns:location', ns)
+        title_node = track.find('ns:title', ns)
+        if title_node is not None and title_node.text:
+            title = title_node.text
+        else:
+            title = Path(unquote(location.text)).stem if location is not None else "Desconocido"
+        playlist.append({
+            "title": title,
+            "location": unquote(location.text) if location is not None else ""
+        })
+    return playlist
+
+
+def build_rotated_xspf_etree(original_path, idx, out_path):
+    """
+    build_rotated_xspf antes de XSPFRotator: ET.parse, rotar los <track>,
+    renumerar vlc:id (con su print por pista) y volver a serializar.
+    """
+    ET.register_namespace('', 'http://xspf.org/ns/0/')
+    ET.register_namespace('vlc', 'http://www.videolan.org/vlc/playlist/ns/0/')
+    tree = ET.parse(original_path)
+    root = tree.getroot()
+    tracks = root.findall('.//{http://xspf.org/ns/0/}track')
+    rotated = tracks[idx:] + tracks[:idx]
+    tracklist = root.find('.//{http://xspf.org/ns/0/}trackList')
+    tracklist.clear()
+    for new_idx, trk in enumerate(rotated):
+        vlc_ext = trk.find('{http://xspf.org/ns/0/}extension')
+        if vlc_ext is not None:
+            vlc_id = vlc_ext.find('{http://www.videolan.org/vlc/playlist/ns/0/}id')
+            if vlc_id is not None:
+                vlc_id.text = str(new_idx)
+                print(f'     |- vlc:id {vlc_id.text} -> {new_idx}')
+            else:
+                print('     |- vlc:id no encontrado')
+        else:
+            print('     |- extension no encontrada')
+    for trk in rotated:
+        tracklist.append(trk)
+    tree.write(out_path, encoding='utf-8', xml_declaration=True)
+    return out_path
+
+
+# ============================================================
+# Benchmarks
+# ============================================================
+def run_benchmarks(tmp, tracks, processes, folder_files=100000):
+    import VLC
+    import getCanciones
+
+    xspf = os.path.join(tmp, "lista.xspf")
+    make_xspf(xspf, tracks)
+    ini = os.path.join(tmp, "vlc-qt-interface.ini")
+    make_ini(ini, 5000)
+    tree = os.path.join(tmp, "musica")
+    make_tree(tree, max(1, folder_files // FILES_PER_FOLDER), FILES_PER_FOLDER)
+
+    table = {pid: FakeProcess(pid, f"proceso{pid}.exe") for pid in range(processes)}
+    table[processes - 1] = FakeProcess(processes - 1, "vlc.exe")
+
+    def process_iter(attrs=None):
+        return iter(list(table.values()))
+
+    def process_factory(pid):
+        try:
+            return table[pid]
+        except KeyError:
+            raise VLC.psutil.NoSuchProcess(pid) from None
+
+    controller = VLC.VLCController()
+    out = os.path.join(tmp, "rotada.xspf")
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    def ini_cold():
+        cache = VLC.CurrentSongCache(ini)
+        cache.get()
+
+    warm_ini = VLC.CurrentSongCache(ini)
+    warm_ini.get()
+
+    def rotate():
+        VLC.xspf_rotator.write(xspf, tracks // 2, out)
+
+    def rotate_etree():
+        with quiet:
+            build_rotated_xspf_etree(xspf, tracks // 2, out)
+
+    def canciones_read():
+        with quiet:
+            getCanciones.read_xspf_playlist(xspf)
+
+    def scan_cold():
+        VLC.FolderIndex(recursive=True).files(tree)
+
+    warm_folder = VLC.FolderIndex(recursive=True)
+    warm_folder.files(tree)
+
+    warm_tracker = VLC.VLCProcessTracker(process_iter, process_factory)
+    warm_tracker.find_pid()
+
+    windows = FakeWindowBackend(5000, processes - 1)
+
+    def window_state_scan():
+        VLC.VLCWindowService(windows, warm_tracker).state()
+
+    warm_windows = VLC.VLCWindowService(windows, warm_tracker)
+    warm_windows.state()
+
+    snapshot = VLC.PlaylistSnapshot(xspf, os.path.join(tmp, "lista.snap"))
+    st = os.stat(xspf)
+    snapshot_key = (st.st_mtime_ns, st.st_size)
+    snapshot.save(controller.read_xspf_playlist(xspf), snapshot_key)
+
+    def snapshot_load():
+        snapshot.load(snapshot_key).close()
+
+    def snapshot_load_titles():
+        playlist = snapshot.load(snapshot_key)
+        for i in range(len(playlist)):
+            playlist.title(i)
+        playlist.close()
+
+    # Cola de reproducción: coste por operación con QUEUE_SIZE pistas
+    queue = VLC.PlayQueue(range(QUEUE_SIZE), writer=None)
+    middle = QUEUE_SIZE // 2
+
+    def queue_insert_remove():
+        queue.insert(middle, 0)
+        queue.remove(middle)
+
+    dupe_paths, dupe_bytes = make_dupe_tree(os.path.join(tmp, "duplicados"))
+    print(f"(árbol de duplicados: {len(dupe_paths)} archivos, {dupe_bytes / 1e6:.0f} MB)")
+
+    def dedupe_cold(workers):
+        return lambda: VLC.DuplicateFinder(workers=workers).canonical(dupe_paths)
+
+    warm_dedupe = VLC.DuplicateFinder()
+    warm_dedupe.canonical(dupe_paths)
+
+    # Filtrado del selector: coste por pulsación con SEARCH_TITLES títulos,
+    # tecleando una consulta letra a letra y borrándola después
+    search_index = VLC.PlaylistSearchIndex(
+        f"Canción {i} – Artista {i % 997} ({'En vivo' if i % 7 else 'Remaster'})"
+        for i in range(SEARCH_TITLES))
+    typed = "artista 99 remaster"
+    keystrokes = [typed[:n] for n in range(1, len(typed) + 1)]
+    keystrokes += keystrokes[-2::-1] + [""]
+
+    def search_typing():
+        for text in keystrokes:
+            search_index.search(text)
+
+    # Caché de metadatos: consulta en bloque y reescaneo con un 1% cambiado
+    media_dir = os.path.join(tmp, "media")
+    os.makedirs(media_dir)
+    media = [os.path.join(media_dir, f"pista {i}.mp3") for i in range(METADATA_FILES)]
+    for path in media:
+        open(path, "wb").close()
+    metadata = VLC.MetadataCache(os.path.join(tmp, "metadata.sqlite"),
+                                 reader=lambda path: ("Título", 180000))
+    metadata.scan(media)
+    rescans = [0]
+
+    def metadata_rescan_1pct():
+        rescans[0] += 1
+        stamp = rescans[0] * 1_000_000_000
+        for path in media[::100]:
+            os.utime(path, ns=(stamp, stamp))
+        metadata.scan(media)
+
+    # Cambiar de pista: 'goto' por RC frente a matar y relanzar. El
+    # relanzamiento usa un proceso Python como sustituto de vlc.exe, así que
+    # es una cota inferior (el arranque real de VLC es bastante más lento).
+    rc_server = FakeVLCServer()
+    remote = VLC.VLCRemote(port=rc_server.port)
+    stand_in = [sys.executable, "-c", "import sys; print('ok', flush=True); sys.stdin.read()"]
+    running = [subprocess.Popen(stand_in, stdin=subprocess.PIPE, stdout=subprocess.PIPE)]
+
+    def switch_relaunch():
+        running[0].kill()
+        running[0].wait()
+        VLC.xspf_rotator.write(xspf, tracks // 3, out)
+        running[0] = subprocess.Popen(stand_in, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        running[0].stdout.readline()  # el sustituto ya está en marcha
+
+    disabled_tracer = VLC.Tracer(enabled=False)
+
+    def disabled_span():
+        with disabled_tracer.span("bench"):
+            pass
+
+    cases = {
+        "ini_current_song_cold": (ini_cold, 5),
+        "ini_current_song_warm": (warm_ini.get, 1000),
+        "decode_uri": (lambda: VLC.decode_uri('"file:///C:/M%C3%BAsica/Album%201/pista%2010.mp3"'), 10000),
+        "vlc_read_xspf_playlist": (lambda: controller.read_xspf_playlist(xspf), 1),
+        "getcanciones_read_xspf_playlist": (canciones_read, 1),
+        "playlist_snapshot_load": (snapshot_load, 20),
+        "playlist_snapshot_load_titles": (snapshot_load_titles, 1),
+        "build_rotated_xspf": (rotate, 3),
+        "build_rotated_xspf_etree": (rotate_etree, 1),
+        "process_lookup_scan": (lambda: VLC.VLCProcessTracker(process_iter, process_factory).find_pid(), 5),
+        "process_lookup_cached": (warm_tracker.find_pid, 10000),
+        "folder_scan_cold": (scan_cold, 3),
+        "folder_scan_warm": (lambda: warm_folder.files(tree), 100),
+        "queue_jump": (lambda: queue.jump(middle), 100000),
+        "queue_getitem": (lambda: queue[middle], 100000),
+        "queue_play_next": (lambda: queue.play_next(0), 10000),
+        "queue_enqueue": (lambda: queue.enqueue(0), 10000),
+        "queue_insert_remove_middle": (queue_insert_remove, 10000),
+        "queue_shuffle": (lambda: queue.shuffle(1), 1),
+        "dedupe_tree_cold_1_worker": (dedupe_cold(1), 3),
+        "dedupe_tree_cold_4_workers": (dedupe_cold(4), 3),
+        "dedupe_tree_warm": (lambda: warm_dedupe.canonical(dupe_paths), 10),
+        "search_per_keystroke": (search_typing, 3, len(keystrokes)),
+        "metadata_lookup_100k": (lambda: metadata.lookup(media), 3),
+        "metadata_rescan_1pct": (metadata_rescan_1pct, 1),
+        "switch_track_rc_goto": (lambda: remote.goto(tracks // 3), 1000),
+        "switch_track_kill_relaunch": (switch_relaunch, 5),
+        "now_playing_poll": (VLC.NowPlayingService(remote).poll_once, 1000),
+        "tracer_disabled_span": (disabled_span, 100000),
+        "window_state_scan": (window_state_scan, 20),
+        "window_state_cached": (warm_windows.state, 10000),
+    }
+
+    results = {}
+    try:
+        for name, (fn, number, *per_call) in cases.items():
+            # per_call: operaciones que hace cada llamada (p. ej. pulsaciones)
+            best = min(timeit.repeat(fn, number=number, repeat=3)) / number
+            best /= per_call[0] if per_call else 1
+            results[name] = best
+            print(f"{name:36s} {best * 1e6:14.1f} us")
+    finally:
+        running[0].kill()
+        running[0].wait()
+        remote.close()
+        rc_server.close()
+    return results
+
+
+def run_library_benchmarks(tmp, playlists, entries, workers=(1, 2, 4, 8)):
+    """Construcción del índice de biblioteca con 1..8 procesos y consultas."""
+    import VLC
+
+    root = os.path.join(tmp, "biblioteca")
+    make_library(root, playlists, entries)
+    results = {}
+
+    def record(name, seconds):
+        results[name] = seconds
+        print(f"{name:36s} {seconds * 1e6:14.1f} us")
+
+    for n in workers:
+        library = VLC.LibraryIndex([root], workers=n, min_pool=1)
+        start = time.perf_counter()
+        library.refresh()
+        record(f"library_build_{n}_workers", time.perf_counter() - start)
+    print(f"({library.stats()})")
+
+    start = time.perf_counter()
+    library.refresh()
+    record("library_refresh_unchanged", time.perf_counter() - start)
+
+    changed = os.path.join(root, "Listas 0", "lista 0.xspf")
+    with open(changed, "a", encoding="utf-8") as f:
+        f.write("\n")
+    start = time.perf_counter()
+    library.refresh()
+    record("library_refresh_one_changed", time.perf_counter() - start)
+
+    location = library.location(0)
+    for name, fn, number in (("library_search", lambda: library.search("cancion 12"), 100),
+                             ("library_search_prefix", lambda: library.search("artista 99"), 100),
+                             ("library_playlists_with", lambda: library.playlists_with(location), 10000)):
+        record(name, min(timeit.repeat(fn, number=number, repeat=3)) / number)
+    return results
+
+
+def peak_memory(fn):
+    """Pico de memoria (bytes, según tracemalloc) mientras se ejecuta fn()."""
+    import gc
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def run_memory_benchmarks(tmp, sizes=MEMORY_TRACKS):
+    """
+    Pico de memoria y tiempo al leer XSPF de 50k–200k pistas: ET.parse
+    entero (la lectura de antes), iter_xspf_tracks recorrido sin guardar
+    nada y la Playlist columnar que guarda la caché.
+    """
+    import VLC
+
+    readers = {
+        "etree": read_xspf_etree,
+        "stream": lambda path: sum(1 for _ in VLC.iter_xspf_tracks(path)),
+        "playlist": lambda path: VLC.Playlist(VLC.iter_xspf_tracks(path)),
+    }
+    results = {}
+    for n in sizes:
+        xspf = os.path.join(tmp, f"memoria_{n}.xspf")
+        make_xspf(xspf, n)
+        for name, reader in readers.items():
+            peak = peak_memory(lambda: reader(xspf))
+            seconds = min(timeit.repeat(lambda: reader(xspf), number=1, repeat=3))
+            results[f"xspf_peak_{name}_{n // 1000}k"] = peak
+            results[f"xspf_read_{name}_{n // 1000}k"] = seconds
+            print(f"{f'xspf_{name}_{n // 1000}k':36s} {peak / 2 ** 20:10.1f} MB {seconds * 1e3:10.1f} ms")
+    return results
+
+
+def open_display():
+    """Raíz de Tk oculta si hay pantalla (p. ej. con xvfb-run); si no, None."""
+    import tkinter as tk
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        return None
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    return root
+
+
+def selector_first_paint(root, playlist, timeout=10.0):
+    """
+    Segundos desde que se empieza a construir la lista del selector
+    (VirtualListbox + ThinScrollbar, como en el selector) hasta su primer
+    <Expose>, es decir, hasta que está pintada en pantalla.
+    """
+    import tkinter as tk
+    import VLC
+
+    painted = []
+    start = time.perf_counter()
+    window = tk.Toplevel(root)
+    window.overrideredirect(True)
+    frame = tk.Frame(window, bg="#1A1A1A")
+    frame.pack(padx=5, pady=5)
+
+    def render(i):
+        duration = playlist.duration(i) or 0
+        text = f"● {playlist.title(i)}  ({duration // 60000}:{duration // 1000 % 60:02d})"
+        return text, "#FFFFFF", "#151515" if i % 2 else "#101010"
+
+    listbox = VLC.VirtualListbox(frame, len(playlist), render, bg="#101010", fg="#F3F3F3",
+                                 width=50, height=15, activestyle="none")
+    listbox.pack(side=tk.LEFT, fill=tk.BOTH)
+    VLC.ThinScrollbar(frame, listbox, width=8).pack(side=tk.RIGHT, fill=tk.Y)
+    listbox.bind("<Expose>", lambda e: painted.append(time.perf_counter()), add="+")
+    try:
+        while not painted and time.perf_counter() - start < timeout:
+            root.update()
+    finally:
+        window.destroy()
+        root.update()
+    if not painted:
+        raise RuntimeError("la lista no llegó a pintarse")
+    return painted[0] - start
+
+
+def tk_object_count(root):
+    """Widgets, callbacks de after() y fuentes con nombre vivos en Tk."""
+    widgets, stack = 0, [root]
+    while stack:
+        widget = stack.pop()
+        widgets += 1
+        stack.extend(widget.winfo_children())
+    pending = root.tk.splitlist(root.tk.call("after", "info"))
+    fonts = root.tk.splitlist(root.tk.call("font", "names"))
+    return widgets + len(pending) + len(fonts)
+
+
+def tooltip_stress(root, updates=TOOLTIP_UPDATES, rate=1000):
+    """
+    Actualiza el tooltip 'updates' veces a 'rate' por segundo. Devuelve las
+    latencias ordenadas (mostrar + pintar), cuánto han crecido los hilos y
+    los objetos de Tk, y la duración total.
+    """
+    import VLC
+
+    controller = VLC.VLCController()
+    controller.root = root
+    controller.show_custom_tooltip("calentando")  # la ventana se crea una vez
+    root.update()
+    threads, objects = threading.active_count(), tk_object_count(root)
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(updates):
+        due = start + i / rate
+        while time.perf_counter() < due:
+            root.update()
+        t0 = time.perf_counter()
+        controller.show_custom_tooltip(f"Canción {i}")
+        root.update()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    growth = (threading.active_count() - threads, tk_object_count(root) - objects)
+
+    controller.close_tooltip()
+    controller.tooltip_window.destroy()
+    root.update()
+    return sorted(latencies), growth, elapsed
+
+
+def run_gui_benchmarks(tmp, root):
+    """
+    Casos que necesitan pantalla: primer pintado del selector por tamaño y
+    tooltip a 1000 actualizaciones/s. Devuelve (resultados, problemas); un
+    problema es que crezcan los hilos o los objetos de Tk.
+    """
+    import VLC
+
+    results, problems = {}, []
+
+    def record(name, seconds):
+        results[name] = seconds
+        print(f"{name:36s} {seconds * 1e6:14.1f} us")
+
+    for n in FIRST_PAINT_TRACKS:
+        xspf = os.path.join(tmp, f"pintado_{n}.xspf")
+        make_xspf(xspf, n)
+        playlist = VLC.Playlist(VLC.iter_xspf_tracks(xspf))
+        record(f"selector_first_paint_{n // 1000}k",
+               min(selector_first_paint(root, playlist) for _ in range(5)))
+
+    latencies, (threads, objects), elapsed = tooltip_stress(root)
+    record("tooltip_update_p50", latencies[len(latencies) // 2])
+    record("tooltip_update_p99", latencies[int(len(latencies) * 0.99)])
+    print(f"(tooltip: {len(latencies) / elapsed:.0f} act./s, máx {latencies[-1] * 1e3:.1f} ms, "
+          f"hilos {threads:+d}, objetos Tk {objects:+d})")
+    if threads > 0 or objects > 0:
+        problems.append("tooltip_stress")
+        print(f"{'tooltip_stress':36s} hilos {threads:+d}, objetos Tk {objects:+d}  <-- CRECE")
+    return results, problems
+
+
+def measure_import_time():
+    """Tiempo acumulado de 'import VLC' según python -X importtime (en s)."""
+    code = "import bench; bench.install_stubs(); import VLC"
+    best = None
+    for _ in range(3):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=HERE, capture_output=True, text=True)
+        for line in proc.stderr.splitlines():
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) == 3 and parts[2] == "VLC":
+                cumulative = int(parts[1]) / 1e6
+                best = cumulative if best is None else min(best, cumulative)
+    if best is not None:
+        print(f"{'startup_import_vlc':36s} {best * 1e6:14.1f} us")
+    return best
+
+
+# ============================================================
+# Histórico y comparación
+# ============================================================
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def compare(previous, results):
+    regressions = []
+    print(f"\nComparando con {previous['commit']} ({previous['date']}):")
+    for name, value in results.items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+        ratio = value / before
+        mark = ""
+        if ratio > REGRESSION_RATIO:
+            mark = "  <-- REGRESION"
+            regressions.append(name)
+        print(f"{name:36s} x{ratio:5.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=10000)
+    parser.add_argument("--folder-files", type=int, default=100000,
+                        help=f"archivos del árbol de carpetas ({FILES_PER_FOLDER} por carpeta)")
+    parser.add_argument("--results", default=str(RESULTS_FILE))
+    parser.add_argument("--library", action="store_true",
+                        help="medir también el índice de biblioteca (tarda minutos)")
+    parser.add_argument("--memory", action="store_true",
+                        help="medir también el pico de memoria al leer XSPF de 50k–200k pistas")
+    parser.add_argument("--library-playlists", type=int, default=1000)
+    parser.add_argument("--library-entries", type=int, default=1000000)
+    parser.add_argument("--check", action="store_true",
+                        help="salir con código 1 si algo empeora más de un 25%%")
+    args = parser.parse_args()
+
+    install_stubs()
+    gui_problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run_benchmarks(tmp, args.tracks, args.processes, args.folder_files)
+        if args.library:
+            results.update(run_library_benchmarks(tmp, args.library_playlists,
+                                                  args.library_entries))
+        if args.memory:
+            results.update(run_memory_benchmarks(tmp))
+        root = open_display()
+        if root is None:
+            print("(sin pantalla: se omiten los casos de interfaz; prueba con xvfb-run)")
+        else:
+            try:
+                gui_results, gui_problems = run_gui_benchmarks(tmp, root)
+                results.update(gui_results)
+            finally:
+                root.destroy()
+    startup = measure_import_time()
+    if startup is not None:
+        results["startup_import_vlc"] = startup
+
+    history = []
+    if os.path.exists(args.results):
+        with open(args.results, encoding="utf-8") as f:
+            history = json.load(f)
+
+    regressions = []
+    # Las ejecuciones de antes de --folder-files usaban 10k archivos
+    comparable = [run for run in history if run.get("tracks") == args.tracks
+                  and run.get("folder_files", 10000) == args.folder_files]
+    if comparable:
+        regressions = compare(comparable[-1], results)
+    regressions += gui_problems
+
+    history.append({"commit": current_commit(),
+                    "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "tracks": args.tracks,
+                    "folder_files": args.folder_files,
+                    "results": results})
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,631 @@
+"""
+Pruebas de VLC.py sin Windows: los módulos de Windows se sustituyen por
+los stubs de bench.py y el sistema de archivos, el registro, VLC y el
+resto de dependencias externas se inyectan.
+
+    python -m pytest -q test_vlc.py
+"""
+import os
+import stat
+import types
+
+import pytest
+
+import bench
+
+bench.install_stubs()
+import VLC  # noqa: E402
+
+
+# ============================================================
+# VLCLocator
+# ============================================================
+class FakeFS:
+    """stat/which/registro sintéticos que cuentan cuántas veces se usan."""
+
+    def __init__(self, files, install_dir=None, on_path=None):
+        self.files = dict(files)  # ruta -> mtime_ns
+        self.install_dir = install_dir
+        self.on_path = on_path
+        self.calls = 0
+
+    def stat(self, path):
+        self.calls += 1
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return types.SimpleNamespace(st_mode=stat.S_IFREG, st_mtime_ns=self.files[path])
+
+    def which(self, name):
+        self.calls += 1
+        return self.on_path
+
+    def registry(self):
+        self.calls += 1
+        return self.install_dir
+
+
+VLC_EXE = os.path.join(r"D:\VLC", "vlc.exe")
+
+
+def make_locator(fs, tmp_path, env=None):
+    return VLC.VLCLocator(cache_path=str(tmp_path / "vlc_path.json"), env=env or {},
+                          stat=fs.stat, which=fs.which, registry=fs.registry)
+
+
+def test_locator_repeat_calls_do_no_filesystem_work(tmp_path):
+    fs = FakeFS({VLC_EXE: 1}, install_dir=r"D:\VLC")
+    locator = make_locator(fs, tmp_path)
+    assert locator.find() == VLC_EXE
+    calls = fs.calls
+    for _ in range(100):
+        assert locator.find() == VLC_EXE
+    assert fs.calls == calls
+
+
+def test_locator_uses_disk_cache_before_registry(tmp_path):
+    fs = FakeFS({VLC_EXE: 1}, install_dir=r"D:\VLC")
+    make_locator(fs, tmp_path).find()
+
+    fs.install_dir = None  # si se consultara el registro ya no lo encontraría
+    assert make_locator(fs, tmp_path).find() == VLC_EXE
+
+
+def test_locator_disk_cache_is_validated_by_mtime(tmp_path):
+    fs = FakeFS({VLC_EXE: 1}, install_dir=r"D:\VLC")
+    make_locator(fs, tmp_path).find()
+
+    other = os.path.join(r"E:\Apps\VLC", "vlc.exe")
+    fs.files = {VLC_EXE: 2, other: 1}  # vlc.exe actualizado
+    fs.install_dir = r"E:\Apps\VLC"
+    assert make_locator(fs, tmp_path).find() == other
+
+
+def test_locator_env_override_and_invalidate(tmp_path):
+    override = os.path.join(r"C:\portable", "vlc.exe")
+    fs = FakeFS({VLC_EXE: 1, override: 1}, install_dir=r"D:\VLC")
+    locator = make_locator(fs, tmp_path, env={"VLC_PATH": override})
+    assert locator.find() == override
+
+    locator.env = {}
+    assert locator.find() == override  # memorizado
+    locator.invalidate()
+    assert locator.find() == VLC_EXE
+
+
+def test_locator_not_found(tmp_path):
+    fs = FakeFS({})
+    assert make_locator(fs, tmp_path).find() is None
+
+
+# ============================================================
+# VLCRemote y NowPlayingService contra un servidor RC falso
+# ============================================================
+def test_remote_goto_sends_one_based_index():
+    server = bench.FakeVLCServer()
+    remote = VLC.VLCRemote(port=server.port)
+    try:
+        assert remote.goto(6)
+        assert remote.is_playing()
+        assert server.commands == ["goto 7", "is_playing"]
+        assert server.connections == 1  # conexión persistente
+    finally:
+        remote.close()
+        server.close()
+
+
+def test_remote_reconnects_after_dropped_connection():
+    server = bench.FakeVLCServer()
+    remote = VLC.VLCRemote(port=server.port)
+    try:
+        assert remote.goto(0)
+        server.drop()
+        assert remote.goto(1)
+        assert server.commands[-1] == "goto 2"
+        assert server.connections == 2
+    finally:
+        remote.close()
+        server.close()
+
+
+def test_remote_without_vlc_returns_false():
+    server = bench.FakeVLCServer()
+    port = server.port
+    server.close()
+    remote = VLC.VLCRemote(port=port, timeout=0.2)
+    assert not remote.goto(0)
+    assert remote.command("status") is None
+
+
+def test_now_playing_notifies_only_on_change():
+    server = bench.FakeVLCServer("file:///C:/M%C3%BAsica/Canci%C3%B3n%20uno.mp3")
+    remote = VLC.VLCRemote(port=server.port)
+    service = VLC.NowPlayingService(remote)
+    seen = []
+    service.subscribe(seen.append)
+    try:
+        assert service.poll_once()
+        assert not service.poll_once()
+        server.current = "file:///C:/M%C3%BAsica/dos.mp3"
+        assert service.poll_once()
+        assert seen == ["Canción uno", "dos"]
+        assert service.current == "dos"
+    finally:
+        remote.close()
+        server.close()
+
+
+# ============================================================
+# MetadataCache
+# ============================================================
+def test_metadata_scan_skipped_without_reader(tmp_path):
+    track = tmp_path / "pista.mp3"
+    track.write_bytes(b"")
+    calls = []
+    cache = VLC.MetadataCache(str(tmp_path / "meta.sqlite"),
+                              reader=lambda path: calls.append(path),
+                              reader_available=lambda: False)
+    assert cache.scan([str(track)]) == 0
+    assert calls == [] and cache.lookup([str(track)]) == {}
+
+
+def test_metadata_rescan_only_changed(tmp_path):
+    tracks = [tmp_path / f"{i}.mp3" for i in range(3)]
+    for track in tracks:
+        track.write_bytes(b"")
+    paths = [str(t) for t in tracks]
+    cache = VLC.MetadataCache(str(tmp_path / "meta.sqlite"),
+                              reader=lambda path: (os.path.basename(path), 1000))
+    assert cache.scan(paths) == 3
+    assert cache.scan(paths) == 0
+    os.utime(paths[1], ns=(1, 1))
+    assert cache.scan(paths) == 1
+    assert cache.lookup(paths)[paths[2]] == ("2.mp3", 1000)
+
+
+# ============================================================
+# FileWatcher (sondeo con stat, sin notificaciones de Windows)
+# ============================================================
+def test_watcher_debounces_burst_of_writes(tmp_path):
+    playlist = tmp_path / "lista.xspf"
+    playlist.write_text("a")
+    watcher = VLC.FileWatcher(callback=None, debounce=0.3, use_notifications=False)
+    watcher.watch([playlist])
+
+    playlist.write_text("ab")
+    assert watcher.check(now=0.0) == []
+    playlist.write_text("abc")  # sigue escribiéndose
+    assert watcher.check(now=0.2) == []
+    assert watcher.check(now=0.4) == []
+    assert watcher.check(now=0.6) == [str(playlist)]
+    assert watcher.check(now=5.0) == []
+
+
+def test_watcher_reports_deleted_and_created_files(tmp_path):
+    old, new = tmp_path / "vieja.xspf", tmp_path / "nueva.xspf"
+    old.write_text("a")
+    watcher = VLC.FileWatcher(callback=None, debounce=0, use_notifications=False)
+    watcher.watch([old, new])
+
+    old.unlink()
+    new.write_text("b")
+    assert sorted(watcher.check(now=0.0) + watcher.check(now=0.0)) == sorted([str(old), str(new)])
+
+
+def test_watcher_thread_survives_watch_changes(tmp_path):
+    first, second = tmp_path / "a.xspf", tmp_path / "b.xspf"
+    first.write_text("a")
+    second.write_text("b")
+    seen = []
+    changed = VLC.threading.Event()
+
+    def callback(paths):
+        seen.extend(paths)
+        changed.set()
+
+    watcher = VLC.FileWatcher(callback, interval=0.01, debounce=0.02)
+    watcher.watch([first])
+    watcher.start()
+    try:
+        for _ in range(50):  # como prefetch(): watch() desde otro hilo
+            watcher.watch([second] if watcher._paths == (str(first),) else [first])
+        watcher.watch([second])
+        second.write_text("bb")
+        assert changed.wait(2)
+        assert seen == [str(second)] and watcher._thread.is_alive()
+    finally:
+        watcher.stop()
+
+
+# ============================================================
+# PlayQueue / XSPFRotator
+# ============================================================
+def xspf_ids(path):
+    text = open(path, encoding="utf-8").read()
+    ids = [int(i) for i in VLC.re.findall(r"<vlc:id>(\d+)</vlc:id>", text)]
+    tids = [int(i) for i in VLC.re.findall(r'<vlc:item tid="(\d+)"/>', text)]
+    return ids, tids
+
+
+def test_queue_footer_matches_tracks_after_insertions(tmp_path):
+    source, out = str(tmp_path / "lista.xspf"), str(tmp_path / "cola.xspf")
+    bench.make_xspf(source, 4)
+    tracks = VLC.Playlist(VLC.iter_xspf_tracks(source))
+    rotator = VLC.XSPFRotator()
+    queue = VLC.PlayQueue(tracks, lambda items, path: rotator.write_order(source, items, path),
+                          source=source)
+    queue.play_next(3)
+    queue.enqueue(0)
+    queue.materialize(out)
+
+    ids, tids = xspf_ids(out)
+    assert ids == tids == list(range(6))
+    assert len(VLC.Playlist(VLC.iter_xspf_tracks(out))) == 6
+
+
+def test_rotation_keeps_footer(tmp_path):
+    source, out = str(tmp_path / "lista.xspf"), str(tmp_path / "rotada.xspf")
+    bench.make_xspf(source, 5)
+    VLC.XSPFRotator().write(source, 2, out)
+    ids, tids = xspf_ids(out)
+    assert ids == tids == list(range(5))
+    assert open(out, "rb").read().endswith(open(source, "rb").read()[-40:])
+
+
+def make_queue(tmp_path, n=4):
+    source = str(tmp_path / "lista.xspf")
+    bench.make_xspf(source, n)
+    tracks = VLC.Playlist(VLC.iter_xspf_tracks(source))
+    rotator = VLC.XSPFRotator()
+    return VLC.PlayQueue(tracks, lambda items, path: rotator.write_order(source, items, path),
+                         source=source)
+
+
+def test_queue_advances_only_on_natural_track_change(tmp_path, monkeypatch):
+    controller = VLC.VLCController()
+    queue = controller.play_queue = make_queue(tmp_path)
+    queue.play_next(3)  # cola: 0 3 1 2 3, VLC sigue con el archivo 0 1 2 3
+    launched = []
+    monkeypatch.setattr(controller, "launch_queue", lambda q, stage: launched.append(q.current))
+
+    controller.apply_queue("pista 2")  # salto a mano: se sigue a VLC
+    assert launched == [] and queue.current == 2 and queue.dirty
+
+    queue.jump(0)
+    controller.apply_queue("pista 1")  # siguiente en el archivo: se aplica la cola
+    assert launched == [3]
+
+
+def test_vlc_relaunches_are_serialized(tmp_path, monkeypatch):
+    controller = VLC.VLCController()
+    queue = make_queue(tmp_path)
+    running, overlaps = [], []
+
+    def slow_close():
+        overlaps.append(len(running))
+        running.append(1)
+        VLC.time.sleep(0.02)
+        running.pop()
+
+    monkeypatch.setattr(VLC, "close_vlc", slow_close)
+    monkeypatch.setattr(VLC, "find_vlc", lambda: None)
+    monkeypatch.setattr(VLC, "get_vlc_window_state", lambda: "normal")
+    monkeypatch.setattr(controller, "ui", lambda fn, *args: None)
+    threads = [VLC.threading.Thread(target=controller.launch_queue, args=(queue, "select"))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [0, 0, 0, 0]
+
+
+class FakeRemote:
+    def __init__(self):
+        self.gotos = []
+
+    def goto(self, idx):
+        self.gotos.append(idx)
+        return True
+
+
+def test_select_uses_goto_only_for_the_playlist_vlc_has(tmp_path, monkeypatch):
+    controller = VLC.VLCController()
+    queue = make_queue(tmp_path)
+    remote, launched = FakeRemote(), []
+    monkeypatch.setattr(VLC, "vlc_remote", remote)
+    monkeypatch.setattr(controller, "ui", lambda fn, *args: None)
+    monkeypatch.setattr(controller, "launch_queue", lambda q, stage: launched.append(q.current))
+
+    vlc_playlist = [str(tmp_path / "otra.xspf")]
+    monkeypatch.setattr(controller, "get_vlc_playlist_path", lambda verbose=True: vlc_playlist[0])
+    controller.play_playlist_index(queue.source, queue.tracks, 2)
+    assert remote.gotos == [] and launched == [2]  # VLC tiene otra playlist
+
+    vlc_playlist[0] = queue.source
+    controller.play_playlist_index(queue.source, queue.tracks, 3)
+    assert remote.gotos == [3] and launched == [2]
+
+
+# ============================================================
+# HotkeyDispatcher
+# ============================================================
+class FakeRoot:
+    def after(self, ms, fn):
+        pass
+
+
+def test_background_work_does_not_take_hotkey_threads():
+    dispatcher = VLC.HotkeyDispatcher(FakeRoot(), max_workers=1)
+    release, ran = VLC.threading.Event(), VLC.threading.Event()
+    assert dispatcher.background("library", release.wait)
+    assert dispatcher.background("prefetch", release.wait)
+    assert not dispatcher.background("prefetch", release.wait)  # ya en espera
+    dispatcher.submit("popup", ran.set)
+    try:
+        assert ran.wait(2)  # el atajo no espera al escaneo
+    finally:
+        release.set()
+
+
+def test_library_is_not_rescanned_on_every_ini_change(monkeypatch):
+    controller = VLC.VLCController()
+    controller.dispatcher = VLC.HotkeyDispatcher(FakeRoot())
+    jobs = []
+    monkeypatch.setattr(controller.dispatcher, "background", lambda name, work: jobs.append(name))
+    monkeypatch.setattr(controller, "get_vlc_playlist_path", lambda verbose=True: None)
+    ini = str(VLC.current_song_cache.ini_path)
+
+    controller.prefetch()  # arranque
+    for _ in range(5):
+        controller.on_watched_change([ini])
+        controller.prefetch()
+    assert jobs.count("library") == 1 and jobs.count("prefetch") == 5
+
+    controller.on_watched_change([r"C:\listas\lista.xspf"])  # se guardó la playlist
+    controller.prefetch()
+    assert jobs.count("library") == 2
+
+
+def test_folder_xspf_is_rewritten_after_another_writer(tmp_path):
+    out = str(tmp_path / "cola.xspf")
+    folder = [str(tmp_path / f"{i}.mp3") for i in range(3)]
+    index = VLC.FolderIndex()
+    index.write_xspf(folder, out)
+
+    bench.make_xspf(out, 5)  # una cola de playlist sobrescribe el archivo
+    index.write_xspf(folder, out)
+    assert [t["location"] for t in VLC.Playlist(VLC.iter_xspf_tracks(out))] == \
+        [VLC.Path(f).as_uri() for f in folder]
+
+
+def test_folder_queues_do_not_share_playlist_queue_files(tmp_path):
+    controller = VLC.VLCController()
+    folder_file = controller.queue_file(controller.folder_queue([str(tmp_path / "a.mp3")]))
+    playlist_file = controller.queue_file(make_queue(tmp_path))
+    assert VLC.os.path.basename(folder_file) not in VLC.QUEUE_FILES
+    assert VLC.os.path.basename(playlist_file) in VLC.QUEUE_FILES
+
+
+# ============================================================
+# LibraryIndex
+# ============================================================
+def test_library_refresh_publishes_a_new_snapshot(tmp_path):
+    bench.make_library(str(tmp_path), playlists=4, entries=400)
+    library = VLC.LibraryIndex([str(tmp_path)], workers=1)
+    assert library.refresh() == 4
+    before = library._maps
+    found = library.search("cancion 1")
+    assert found and all("1" in library.title(tid) for tid in found)
+
+    removed = str(tmp_path / "Listas 0" / "lista 0.xspf")
+    VLC.os.remove(removed)
+    added = tmp_path / "nueva.xspf"
+    added.write_text('<playlist xmlns="http://xspf.org/ns/0/"><trackList><track>'
+                     '<location>file:///C:/otra.mp3</location><title>Tema nuevo</title>'
+                     '</track></trackList></playlist>', encoding="utf-8")
+    assert library.refresh() == 2
+    assert library.search("tema") and library.playlists_of(library.search("tema")[0]) == [str(added)]
+    assert removed not in library._maps.playlists
+    # el estado ya publicado no se toca: una consulta en curso sigue viendo el anterior
+    assert library._maps is not before
+    assert removed in before.playlists and not before.words.get("tema")
+    assert all(removed in before.containing[tid] for tid in before.playlists[removed][1])
+
+
+def test_library_queries_do_not_wait_for_refresh(tmp_path, monkeypatch):
+    bench.make_library(str(tmp_path), playlists=2, entries=100)
+    library = VLC.LibraryIndex([str(tmp_path)], workers=1)
+    library.refresh()
+    (tmp_path / "Listas 0" / "lista 0.xspf").write_text("<playlist/>", encoding="utf-8")
+
+    merging, release = VLC.threading.Event(), VLC.threading.Event()
+    remove = VLC._LibraryMaps.remove
+
+    def slow_remove(maps, path):
+        merging.set()
+        release.wait(2)
+        remove(maps, path)
+
+    monkeypatch.setattr(VLC._LibraryMaps, "remove", slow_remove)
+    worker = VLC.threading.Thread(target=library.refresh)
+    worker.start()
+    try:
+        assert merging.wait(2)
+        start = VLC.time.perf_counter()
+        assert library.search("cancion")
+        assert library.playlists_of(0)
+        assert VLC.time.perf_counter() - start < 0.5
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_selections_are_never_dropped(monkeypatch):
+    controller = VLC.VLCController()
+    release, played = VLC.threading.Event(), []
+
+    def play(idx):
+        release.wait(2)  # p. ej. play_library_track parseando otra playlist
+        played.append(idx)
+
+    futures = [controller.run_selection(play, idx) for idx in (4, 7, 2)]
+    release.set()
+    for future in futures:
+        future.result(2)
+    assert played == [4, 7, 2]
+
+
+def test_search_finds_tag_titles_shown_in_selector(tmp_path):
+    source = str(tmp_path / "lista.xspf")
+    bench.make_xspf(source, 6)
+    playlist = VLC.Playlist(VLC.iter_xspf_tracks(source))
+    controller = VLC.VLCController()
+
+    metadata = {4: ("Bohemian Rhapsody", 354000)}
+    index = controller.search_index(playlist, metadata).result(2)
+    assert controller.track_label(playlist, metadata, 4)[0] == "Bohemian Rhapsody"
+    assert index.search("rhapsody") == [4]
+    assert 4 in index.search(VLC.normalize_text(playlist.title(4)))  # y el título de la playlist
+    # metadatos nuevos (otra generación): otro índice
+    assert controller.search_index(playlist, metadata) is controller.search_index(playlist, metadata)
+    newer = {4: ("Otra", None)}
+    assert controller.search_index(playlist, newer).result(2).search("rhapsody") == []
+
+
+class SlowSocket:
+    """Socket real que cede el hilo tras cada envío: agranda la ventana de carrera."""
+
+    def __init__(self, sock):
+        self._sock = sock
+
+    def sendall(self, data):
+        self._sock.sendall(data)
+        VLC.time.sleep(0.001)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def test_remote_close_during_command_does_not_break_it():
+    server = bench.FakeVLCServer()
+    remote = VLC.VLCRemote(port=server.port, connect=lambda addr, timeout: SlowSocket(
+        VLC.socket.create_connection(addr, timeout)))
+    stop, errors = VLC.threading.Event(), []
+
+    def poll():
+        while not stop.is_set():
+            try:
+                remote.command("status")
+            except Exception as e:  # AttributeError si close() cambia _sock a medias
+                errors.append(e)
+
+    thread = VLC.threading.Thread(target=poll)
+    thread.start()
+    try:
+        for _ in range(200):
+            remote.close()  # como close_vlc() desde un atajo
+            VLC.time.sleep(0.0005)
+    finally:
+        stop.set()
+        thread.join()
+        remote.close()
+        server.close()
+    assert errors == []
+
+
+def test_now_playing_thread_survives_errors():
+    class FlakyRemote:
+        calls = 0
+
+        def command(self, cmd):
+            self.calls += 1
+            if self.calls == 1:
+                raise AttributeError("'NoneType' object has no attribute 'recv'")
+            return "( new input: file:///C:/dos.mp3 )"
+
+    service = VLC.NowPlayingService(FlakyRemote(), min_interval=0.01, max_interval=0.01)
+    seen = VLC.threading.Event()
+    service.subscribe(lambda name: seen.set())
+    service.start()
+    try:
+        assert seen.wait(2) and service.current == "dos"
+    finally:
+        service.stop()
+
+
+def test_rotation_matches_the_elementtree_version(tmp_path):
+    for n in (1, 2, 3, 50):
+        source = str(tmp_path / f"lista_{n}.xspf")
+        bench.make_xspf(source, n)
+        for idx in {0, n // 2, n - 1}:
+            new, old = str(tmp_path / "nueva.xspf"), str(tmp_path / "vieja.xspf")
+            VLC.XSPFRotator().write(source, idx, new)
+            with VLC.contextlib.redirect_stdout(None):
+                bench.build_rotated_xspf_etree(source, idx, old)
+            assert list(VLC.iter_xspf_tracks(new)) == list(VLC.iter_xspf_tracks(old))
+
+
+# ============================================================
+# PlaylistSnapshot
+# ============================================================
+def snapshot_tracks():
+    return [
+        {"title": "Canción ñandú — 東京", "location": r"C:\Música\Ñu\pista 1.mp3",
+         "duration": 185000, "id": 0},
+        {"title": "plain", "location": r"C:\Música\Ñu\b.mp3", "duration": None, "id": 1},
+        {"title": "Ünïcødé 🎵", "location": r"D:\otra\çà.flac", "duration": 1, "id": None},
+    ]
+
+
+def test_snapshot_round_trip_non_ascii(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "appdata"))
+    music = tmp_path / "Música"
+    music.mkdir()
+    xspf = music / "lista.xspf"
+    xspf.write_text("<playlist/>", encoding="utf-8")
+    playlist = VLC.Playlist(snapshot_tracks())
+    snapshot = VLC.PlaylistSnapshot(str(xspf))
+    key = snapshot._source_key()
+
+    written = snapshot.save(playlist, key)
+    assert written.startswith(str(tmp_path / "appdata" / "vlc-tooltip" / "snapshots"))
+    assert VLC.os.listdir(music) == ["lista.xspf"]  # nada junto a la música
+
+    mapped = VLC.PlaylistSnapshot(str(xspf)).load(key)
+    assert isinstance(mapped, VLC.MappedPlaylist)
+    assert [mapped[i] for i in range(len(mapped))] == [playlist[i] for i in range(len(playlist))]
+    assert mapped.title(0) == "Canción ñandú — 東京"
+    assert snapshot.load((key[0] + 1, key[1])) is None  # el XSPF ha cambiado
+
+
+@pytest.mark.skipif(VLC.array('l').itemsize < 8, reason="array('l') de 32 bits")
+def test_snapshot_save_gives_up_on_int32_overflow(tmp_path):
+    tracks = snapshot_tracks()
+    tracks[0]["duration"] = 2 ** 31
+    snapshot = VLC.PlaylistSnapshot(str(tmp_path / "x.xspf"), str(tmp_path / "x.snap"))
+    assert snapshot.save(VLC.Playlist(tracks), (1, 1)) is None
+    assert not (tmp_path / "x.snap").exists()
+
+
+# ============================================================
+# VirtualListbox (necesita pantalla: xvfb-run python -m pytest)
+# ============================================================
+@pytest.fixture
+def tk_root():
+    root = bench.open_display()
+    if root is None:
+        pytest.skip("sin pantalla")
+    yield root
+    root.destroy()
+
+
+def test_virtual_listbox_selection_follows_the_track(tk_root):
+    listbox = VLC.VirtualListbox(tk_root, 1000, lambda i: (f"fila {i}", "#FFFFFF", "#000000"),
+                                 height=10)
+    listbox.selection_set(3)
+    assert listbox.curselection() == (3,)
+    listbox.yview_scroll(2, "units")
+    assert listbox.curselection() == (3,)  # la misma pista, ahora en la fila 1
+    assert listbox.get(1) == "fila 3"
+    listbox.yview_scroll(5, "units")
+    assert listbox.curselection() == ()  # fuera de la ventana